@@ -0,0 +1,279 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from pymongo import MongoClient, UpdateOne
+from requests.adapters import HTTPAdapter
+
+MONGO_HOST = os.getenv("MONGO_HOST", "mongodb")
+MONGO_PORT = int(os.getenv("MONGO_PORT", "27017"))
+MONGO_DB = os.getenv("MONGO_DB", "headway_speed_test")
+MONGO_USER = os.getenv("MONGO_USER", "scraper")
+MONGO_PASSWORD = os.getenv("MONGO_PASSWORD", "scraper")
+# Wire compression offered to the server, best first; zlib needs no extra package
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
+# Concurrent NPI registry lookups per batch
+NPI_WORKERS = int(os.getenv("NPI_WORKERS", "32"))
+# Registry answers (including "no match") kept across runs
+NPI_CACHE_FILE = os.getenv("NPI_CACHE_FILE", "/app/exports/.npi_cache.json")
+# Lookups resolved per bulk_write round-trip
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "500"))
+
+# State mapping for NPI lookup
+STATE_MAP = {
+    "ALABAMA": "AL",
+    "ALASKA": "AK",
+    "ARIZONA": "AZ",
+    "ARKANSAS": "AR",
+    "CALIFORNIA": "CA",
+    "COLORADO": "CO",
+    "CONNECTICUT": "CT",
+    "DELAWARE": "DE",
+    "FLORIDA": "FL",
+    "GEORGIA": "GA",
+    "HAWAII": "HI",
+    "IDAHO": "ID",
+    "ILLINOIS": "IL",
+    "INDIANA": "IN",
+    "IOWA": "IA",
+    "KANSAS": "KS",
+    "KENTUCKY": "KY",
+    "LOUISIANA": "LA",
+    "MAINE": "ME",
+    "MARYLAND": "MD",
+    "MASSACHUSETTS": "MA",
+    "MICHIGAN": "MI",
+    "MINNESOTA": "MN",
+    "MISSISSIPPI": "MS",
+    "MISSOURI": "MO",
+    "MONTANA": "MT",
+    "NEBRASKA": "NE",
+    "NEVADA": "NV",
+    "NEW HAMPSHIRE": "NH",
+    "NEW JERSEY": "NJ",
+    "NEW MEXICO": "NM",
+    "NEW YORK": "NY",
+    "NORTH CAROLINA": "NC",
+    "NORTH DAKOTA": "ND",
+    "OHIO": "OH",
+    "OKLAHOMA": "OK",
+    "OREGON": "OR",
+    "PENNSYLVANIA": "PA",
+    "RHODE ISLAND": "RI",
+    "SOUTH CAROLINA": "SC",
+    "SOUTH DAKOTA": "SD",
+    "TENNESSEE": "TN",
+    "TEXAS": "TX",
+    "UTAH": "UT",
+    "VERMONT": "VT",
+    "VIRGINIA": "VA",
+    "WASHINGTON": "WA",
+    "WEST VIRGINIA": "WV",
+    "WISCONSIN": "WI",
+    "WYOMING": "WY",
+    "DISTRICT OF COLUMBIA": "DC",
+}
+
+
+NPI_API_URL = "https://npiregistry.cms.hhs.gov/api/"
+# Leading titles stripped from names before a registry lookup
+NAME_PREFIXES = frozenset({"dr", "mr", "mrs", "ms", "mx", "prof"})
+
+# One keep-alive pool shared by all NPI lookup threads
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=NPI_WORKERS, pool_maxsize=NPI_WORKERS)
+)
+
+_NPI_CACHE = None
+
+
+def load_npi_cache():
+    """Return the on-disk NPI cache, reading it on first use"""
+    global _NPI_CACHE
+    if _NPI_CACHE is None:
+        try:
+            with open(NPI_CACHE_FILE, encoding="utf-8") as f:
+                _NPI_CACHE = json.load(f)
+        except (OSError, ValueError):
+            _NPI_CACHE = {}
+    return _NPI_CACHE
+
+
+def save_npi_cache():
+    """Write the NPI cache back to disk atomically"""
+    if _NPI_CACHE is None:
+        return
+    os.makedirs(os.path.dirname(NPI_CACHE_FILE), exist_ok=True)
+    tmp_file = f"{NPI_CACHE_FILE}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(_NPI_CACHE, f)
+    os.replace(tmp_file, NPI_CACHE_FILE)
+
+
+def fetch_npi(name, long_state_name, retries=3):
+    """
+    Fetch NPI number from CMS NPI Registry API
+
+    Args:
+        name (str): Full name of the clinician
+        long_state_name (str): Full state name (e.g., "ALASKA")
+        retries (int): Number of retry attempts
+
+    Returns:
+        str: NPI number or empty string if not found
+    """
+    if not long_state_name or not name:
+        return ""
+
+    # STATE_MAP keys are already upper-case; a direct hit skips .upper()
+    state_code = STATE_MAP.get(long_state_name) or STATE_MAP.get(
+        long_state_name.upper()
+    )
+    if not state_code:
+        return ""
+
+    name_parts = name.split()
+    # "Dr. Jane Doe" is registered as Jane Doe
+    while name_parts and name_parts[0].rstrip(".").lower() in NAME_PREFIXES:
+        name_parts.pop(0)
+    first_name = name_parts[0] if name_parts else ""
+    last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
+
+    # Initials and empty parts never resolve to a single provider
+    if len(first_name) < 2 or len(last_name) < 2:
+        return ""
+
+    # Only definite registry answers are cached; errors are retried next run
+    cache = load_npi_cache()
+    cache_key = f"{first_name}|{last_name}|{state_code}"
+    if cache_key in cache:
+        return cache[cache_key]
+
+    # requests URL-encodes params, so spaces and apostrophes in names are safe
+    params = {
+        "version": "2.1",
+        "first_name": first_name,
+        "last_name": last_name,
+        "state": state_code,
+        "limit": 5,
+    }
+
+    for attempt in range(1, retries + 1):
+        try:
+            response = _SESSION.get(NPI_API_URL, params=params, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                npi_number = ""
+                if data.get("result_count", 0) > 0 and data.get("results"):
+                    npi_number = data["results"][0].get("number", "")
+                cache[cache_key] = npi_number
+                return npi_number
+            return ""
+        except requests.exceptions.Timeout:
+            print(
+                f"[NPI ERROR] Attempt {attempt} for {name} in {long_state_name}: Timeout"
+            )
+        except requests.exceptions.RequestException as e:
+            print(
+                f"[NPI ERROR] Attempt {attempt} for {name} in {long_state_name}: {e}"
+            )
+        except Exception as e:
+            print(
+                f"[NPI ERROR] Attempt {attempt} for {name} in {long_state_name}: {e}"
+            )
+
+        if attempt < retries:
+            time.sleep(attempt)  # Exponential backoff
+
+    return ""
+
+
+def lookup_npi(name, long_state_name):
+    print(f"Fetching NPI for {name} in {long_state_name}")
+    npi_number = fetch_npi(name, long_state_name)
+    if npi_number:
+        print(f"Found NPI for {name}: {npi_number}")
+    return npi_number
+
+
+def get_mongo_client():
+    conn = f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/{MONGO_DB}?authSource=admin"
+    return MongoClient(conn, compressors=MONGO_COMPRESSORS)
+
+
+def flush_updates(collection, batch):
+    """Resolve a batch of (_id, name, state) concurrently and write the hits"""
+    with ThreadPoolExecutor(max_workers=NPI_WORKERS) as pool:
+        found = list(
+            pool.map(
+                lookup_npi,
+                [name for _, name, _ in batch],
+                [state for _, _, state in batch],
+            )
+        )
+
+    ops = [
+        UpdateOne({"_id": doc_id}, {"$set": {"NPI": npi_number}})
+        for (doc_id, _, _), npi_number in zip(batch, found)
+        if npi_number
+    ]
+    if ops:
+        started = time.perf_counter()
+        collection.bulk_write(ops, ordered=False)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Wrote {len(ops)} NPI updates in {elapsed_ms:.0f} ms")
+    return len(ops)
+
+
+def backfill_npi():
+    client = get_mongo_client()
+    db = client[MONGO_DB]
+
+    query = {"NPI": {"$in": [None, ""]}}
+    total_missing = db.clinicians.count_documents(query)
+    print(f"Clinicians missing NPI: {total_missing}")
+
+    if not total_missing:
+        client.close()
+        return
+
+    # Page by _id with short queries instead of holding one cursor open
+    # while slow registry lookups run; an idle cursor times out server-side
+    checked = updated = 0
+    last_id = None
+    try:
+        while True:
+            page_query = dict(query)
+            if last_id is not None:
+                page_query["_id"] = {"$gt": last_id}
+            page = list(
+                db.clinicians.find(page_query, {"Name": 1, "Listed In States": 1})
+                .sort("_id", 1)
+                .limit(BACKFILL_BATCH_SIZE)
+            )
+            if not page:
+                break
+            last_id = page[-1]["_id"]
+
+            batch = [
+                (c["_id"], c.get("Name", ""), c.get("Listed In States", ""))
+                for c in page
+                if c.get("Name") and c.get("Listed In States")
+            ]
+            if batch:
+                updated += flush_updates(db.clinicians, batch)
+                checked += len(batch)
+            save_npi_cache()
+            print(f"Checked {checked} clinicians, updated {updated}...")
+    finally:
+        save_npi_cache()
+
+    print(f"NPI backfill done | checked {checked} | updated {updated}")
+    client.close()
+
+
+if __name__ == "__main__":
+    backfill_npi()
@@ -1,206 +1,300 @@
 import gc
+import json
 import os
-import time
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice, repeat
+from operator import itemgetter
 
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+from bson import decode as bson_decode
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from pymongo import MongoClient
 
+try:
+    import ciso8601
+except ImportError:  # fall back to datetime.fromisoformat
+    ciso8601 = None
+
 MONGO_HOST = os.getenv("MONGO_HOST", "mongodb")
 MONGO_PORT = int(os.getenv("MONGO_PORT", "27017"))
 MONGO_DB = os.getenv("MONGO_DB", "headway_speed_test")
 MONGO_USER = os.getenv("MONGO_USER", "scraper")
 MONGO_PASSWORD = os.getenv("MONGO_PASSWORD", "scraper")
+# Wire compression offered to the server, best first; zlib needs no extra package
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
 OUTPUT_DIR = "/app/exports/headway/"
-
-# State mapping for NPI lookup
-STATE_MAP = {
-    "ALABAMA": "AL",
-    "ALASKA": "AK",
-    "ARIZONA": "AZ",
-    "ARKANSAS": "AR",
-    "CALIFORNIA": "CA",
-    "COLORADO": "CO",
-    "CONNECTICUT": "CT",
-    "DELAWARE": "DE",
-    "FLORIDA": "FL",
-    "GEORGIA": "GA",
-    "HAWAII": "HI",
-    "IDAHO": "ID",
-    "ILLINOIS": "IL",
-    "INDIANA": "IN",
-    "IOWA": "IA",
-    "KANSAS": "KS",
-    "KENTUCKY": "KY",
-    "LOUISIANA": "LA",
-    "MAINE": "ME",
-    "MARYLAND": "MD",
-    "MASSACHUSETTS": "MA",
-    "MICHIGAN": "MI",
-    "MINNESOTA": "MN",
-    "MISSISSIPPI": "MS",
-    "MISSOURI": "MO",
-    "MONTANA": "MT",
-    "NEBRASKA": "NE",
-    "NEVADA": "NV",
-    "NEW HAMPSHIRE": "NH",
-    "NEW JERSEY": "NJ",
-    "NEW MEXICO": "NM",
-    "NEW YORK": "NY",
-    "NORTH CAROLINA": "NC",
-    "NORTH DAKOTA": "ND",
-    "OHIO": "OH",
-    "OKLAHOMA": "OK",
-    "OREGON": "OR",
-    "PENNSYLVANIA": "PA",
-    "RHODE ISLAND": "RI",
-    "SOUTH CAROLINA": "SC",
-    "SOUTH DAKOTA": "SD",
-    "TENNESSEE": "TN",
-    "TEXAS": "TX",
-    "UTAH": "UT",
-    "VERMONT": "VT",
-    "VIRGINIA": "VA",
-    "WASHINGTON": "WA",
-    "WEST VIRGINIA": "WV",
-    "WISCONSIN": "WI",
-    "WYOMING": "WY",
-    "DISTRICT OF COLUMBIA": "DC",
+# Latest snapshot per site; collection.xlsx is only rebuilt from these on demand
+COLLECTION_DIR = "/app/exports/collection/"
+ANALYSIS_FILE = "/app/exports/analysis.xlsx"
+COUNTS_FILE = os.path.join(COLLECTION_DIR, "counts.json")
+# Documents per getMore round-trip; small scraper docs fit well under 16 MiB
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+# Flatten worker processes; 1 keeps everything in the main process
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(os.cpu_count() or 1)))
+# Documents handed to a worker per IPC round-trip
+EXPORT_CHUNKSIZE = int(os.getenv("EXPORT_CHUNKSIZE", "500"))
+# Parquet is always written; the slow per-run xlsx only with EXPORT_XLSX=1
+EXPORT_XLSX = os.getenv("EXPORT_XLSX", "0") == "1"
+
+FROMISOFORMAT_HANDLES_Z = sys.version_info >= (3, 11)
+# Distinct slot timestamps remembered across clinicians; Headway hands out the
+# same half-hour slots to many providers so the hit rate is high
+SLOT_CACHE_SIZE = int(os.getenv("SLOT_CACHE_SIZE", "65536"))
+
+# Indexed by datetime.weekday(); avoids locale-dependent strftime("%a")
+DAY_ABBR = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# 12-hour clock text by hour, zero-padded minutes by minute
+HOUR12 = tuple(str(hour % 12 or 12) for hour in range(24))
+MINUTE2 = tuple(f"{minute:02d}" for minute in range(60))
+
+# Column order - updated to include Availability Summary
+COLUMN_ORDER = [
+    "clinician_id",
+    "Url",
+    "Name",
+    "First Name",
+    "Last Name",
+    "NPI",
+    "Profession",
+    "Clinic Name",
+    "Bio",
+    "Additional Focus Areas",
+    "Treatment Approaches",
+    "Appointment Types",
+    "Communities",
+    "Age Groups",
+    "Languages",
+    "Highlights",
+    "Gender",
+    "Pronouns",
+    "Race Ethnicity",
+    "Licenses",
+    "Locations",
+    "Education",
+    "Faiths",
+    "Min Session Price",
+    "Max Session Price",
+    "Pay Out Of Pocket Status",
+    "Individual Service Rates",
+    "General Payment Options",
+    "Booking Summary",
+    "Booking Url",
+    "Listed In States",
+    "States",
+    "Listed In Websites",
+    "Urls",
+    "Connect Link - Facebook",
+    "Connect Link - Instagram",
+    "Connect Link - LinkedIn",
+    "Connect Link - Twitter",
+    "Connect Link - Website",
+    "Main Specialties",
+    "Accepted IPs",
+    "Sr. NO",
+    "scraped_at",
+    "Availability Summary",  # New column
+]
+
+# Columns derived in flatten_clinician_data rather than read from the document
+COMPUTED_COLUMNS = {"First Name", "Last Name", "Sr. NO", "Availability Summary"}
+
+# Row position of every column, so flattened rows can be built as tuples
+COLUMN_INDEX = {col: idx for idx, col in enumerate(COLUMN_ORDER)}
+
+# Blank defaults for every column; a document is overlaid on top in one merge
+BLANK = dict.fromkeys(COLUMN_ORDER, "")
+ROW_GETTER = itemgetter(*COLUMN_ORDER)
+
+# Every Parquet column is stored as text, matching what lands in collection.xlsx
+PARQUET_SCHEMA = pa.schema([(col, pa.string()) for col in COLUMN_ORDER])
+
+# Only fetch the fields flatten_clinician_data actually reads
+PROJECTION = {
+    **{col: 1 for col in COLUMN_ORDER if col not in COMPUTED_COLUMNS},
+    "Sr": 1,
+    "availability": 1,
+    "_id": 0,
 }
 
 
+# Matches the client settings in get_mongo_client for worker-side decoding
+DECODE_OPTIONS = CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+
+
 def get_mongo_client():
     conn = f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/{MONGO_DB}?authSource=admin"
-    return MongoClient(conn)
+    # Native BSON dates come back as aware UTC datetimes, comparable with
+    # now_aware without any string parsing
+    # Documents arrive as undecoded BSON; decoding happens in the flatten
+    # workers, so the parent only shuttles bytes
+    return MongoClient(
+        conn,
+        compressors=MONGO_COMPRESSORS,
+        tz_aware=True,
+        tzinfo=timezone.utc,
+        document_class=RawBSONDocument,
+    )
+
+
+def future_slots_pipeline(now_aware):
+    """Aggregation that projects PROJECTION but drops past slots server-side.
+
+    Only slots MongoDB can parse as a date at or before now_aware are
+    removed; anything it can't convert is kept so parse_future_slots stays
+    the authority on what counts as a future slot. Non-array availability
+    values are passed through untouched.
+    """
+    slot_start = {
+        "$convert": {
+            "input": "$$slot.startDate",
+            "to": "date",
+            "onError": None,
+            "onNull": None,
+        }
+    }
+    future_only = {
+        "$filter": {
+            "input": "$availability",
+            "as": "slot",
+            "cond": {
+                "$let": {
+                    "vars": {"start": slot_start},
+                    "in": {
+                        "$or": [
+                            {"$eq": ["$$start", None]},
+                            {"$gt": ["$$start", now_aware]},
+                        ]
+                    },
+                }
+            },
+        }
+    }
+    return [
+        {
+            "$project": {
+                **PROJECTION,
+                "availability": {
+                    "$cond": [
+                        {"$isArray": "$availability"},
+                        future_only,
+                        "$availability",
+                    ]
+                },
+            }
+        }
+    ]
 
 
 def parse_datetime(dt_string):
     """Safely parse datetime string with timezone handling"""
-    if not dt_string:
+    if isinstance(dt_string, datetime):
+        return dt_string  # stored as a BSON date, already decoded
+    if not dt_string or not isinstance(dt_string, str):
         return None
+    return _parse_iso(dt_string)
+
+
+@lru_cache(maxsize=SLOT_CACHE_SIZE)
+def _parse_iso(dt_string):
+    if ciso8601 is not None:
+        try:
+            return ciso8601.parse_datetime(dt_string)
+        except ValueError:
+            return None
 
     try:
-        # Handle ISO format with timezone
-        if dt_string.endswith("Z"):
+        # Python 3.11+ parses a trailing "Z" natively; older versions need
+        # it rewritten as an explicit UTC offset
+        if not FROMISOFORMAT_HANDLES_Z and dt_string.endswith("Z"):
             dt_string = dt_string[:-1] + "+00:00"
 
         # Parse as timezone-aware datetime
         return datetime.fromisoformat(dt_string)
-    except (ValueError, AttributeError):
+    except ValueError:
         return None
 
 
-def format_availability_summary(availability):
-    """Format availability in the format: 'wed 12:20, wed 11:20'"""
-    if not availability:
-        return ""
-
-    # Get current time as timezone-aware datetime
-    now_aware = datetime.now(timezone.utc)
+@lru_cache(maxsize=SLOT_CACHE_SIZE)
+def format_slot_label(start_dt):
+    """Format a single slot start as 'wed 12:20'"""
+    # Format: day abbreviation (lowercase) + space + time in 12-hour format without leading zero
+    day_abbr = DAY_ABBR[start_dt.weekday()]  # "wed"
+    return f"{day_abbr} {HOUR12[start_dt.hour]}:{MINUTE2[start_dt.minute]}"
 
-    # Collect future time slots
-    time_slots = []
-    for slot in availability:
-        start_date_str = slot.get("startDate")
-        if start_date_str:
-            start_dt = parse_datetime(start_date_str)
-            if start_dt and start_dt > now_aware:
-                # Format: day abbreviation (lowercase) + space + time in 12-hour format without leading zero
-                day_abbr = start_dt.strftime("%a").lower()  # "wed"
-                time_str = start_dt.strftime(
-                    "%-I:%M"
-                )  # "12:20" (remove leading zero)
-                time_slots.append(f"{day_abbr} {time_str}")
-
-    # Remove duplicates and limit to reasonable number for display
-    unique_slots = list(
-        dict.fromkeys(time_slots)
-    )  # Preserve order while removing duplicates
-    return ", ".join(unique_slots[:10])  # Show first 10 unique slots
-
-
-def fetch_npi(name, long_state_name, retries=3):
-    """
-    Fetch NPI number from CMS NPI Registry API
 
-    Args:
-        name (str): Full name of the clinician
-        long_state_name (str): Full state name (e.g., "ALASKA")
-        retries (int): Number of retry attempts
+def parse_future_slots(availability, now_aware):
+    """Parse each slot's startDate once and keep the ones after now_aware.
 
-    Returns:
-        str: NPI number or empty string if not found
+    Returns (future_slots, earliest_slot): the (start_dt, slot) tuples in
+    their original order, and the first slot with the earliest start (or
+    None when nothing is in the future).
     """
-    state_code = STATE_MAP.get(long_state_name.upper())
-    if not state_code:
-        return ""
+    future_slots = []
+    earliest_dt = earliest_slot = None
+    for slot in availability:
+        start_dt = parse_datetime(slot.get("startDate"))
+        if start_dt and start_dt > now_aware:
+            future_slots.append((start_dt, slot))
+            if earliest_dt is None or start_dt < earliest_dt:
+                earliest_dt, earliest_slot = start_dt, slot
+    return future_slots, earliest_slot
 
-    name_parts = name.split(" ")
-    first_name = name_parts[0] if name_parts else ""
-    last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
 
-    if not first_name or not last_name:
+def format_availability_summary(future_slots):
+    """Format parsed future slots in the format: 'wed 12:20, wed 11:20'"""
+    if not future_slots:
         return ""
 
-    url = f"https://npiregistry.cms.hhs.gov/api/?version=2.1&first_name={first_name}&last_name={last_name}&state={state_code}&limit=5"
+    # Keep the first 10 unique labels in order, stopping as soon as we have them
+    seen, out = set(), []
+    for start_dt, _ in future_slots:
+        label = format_slot_label(start_dt)
+        if label in seen:
+            continue
+        seen.add(label)
+        out.append(label)
+        if len(out) == 10:
+            break
+    return ", ".join(out)
 
-    for attempt in range(1, retries + 1):
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("result_count", 0) > 0 and data.get("results"):
-                    return data["results"][0].get("number", "")
-            return ""
-        except requests.exceptions.Timeout:
-            print(
-                f"[NPI ERROR] Attempt {attempt} for {name} in {long_state_name}: Timeout"
-            )
-        except requests.exceptions.RequestException as e:
-            print(
-                f"[NPI ERROR] Attempt {attempt} for {name} in {long_state_name}: {e}"
-            )
-        except Exception as e:
-            print(
-                f"[NPI ERROR] Attempt {attempt} for {name} in {long_state_name}: {e}"
-            )
 
-        if attempt < retries:
-            time.sleep(attempt)  # Exponential backoff
+def to_cell_text(value):
+    """Render a flattened value as Parquet text (None becomes blank)"""
+    return "" if value is None else str(value)
 
-    return ""
 
+def write_parquet_batch(writer, rows):
+    """Append buffered row tuples to the Parquet file as one row group"""
+    columns = [pa.array(col, type=pa.string()) for col in zip(*rows)]
+    writer.write_table(pa.Table.from_arrays(columns, schema=PARQUET_SCHEMA))
 
-def flatten_clinician_data(c, row_number):
+
+def flatten_clinician_data(c, row_number, now_aware):
     # Extract first name from full name
     full_name = c.get("Name", "")
-    first_name = full_name.split()[0] if full_name else ""
+    name_parts = full_name.split() if full_name else []
+    first_name = name_parts[0] if name_parts else ""
+    last_name = " ".join(name_parts[1:])
 
-    # Process availability to get formatted summary
+    # Parse availability once; summary and next slot both reuse it
     availability = c.get("availability", [])
-    availability_summary = format_availability_summary(availability)
+    future_slots, earliest_slot = (
+        parse_future_slots(availability, now_aware) if availability else ([], None)
+    )
+    availability_summary = format_availability_summary(future_slots)
 
     # Also get next available date for Booking Summary
-    next_available = ""
-    if availability:
-        now_aware = datetime.now(timezone.utc)
-        future_slots = []
-        for slot in availability:
-            start_date_str = slot.get("startDate")
-            if start_date_str:
-                start_dt = parse_datetime(start_date_str)
-                if start_dt and start_dt > now_aware:
-                    future_slots.append(slot)
-
-        if future_slots:
-            earliest_slot = min(
-                future_slots, key=lambda x: parse_datetime(x["startDate"])
-            )
-            next_available = earliest_slot["startDate"]
-
-    # Process treatment approaches
-    treatment_approaches = c.get("Treatment Approaches", "")
+    next_available = earliest_slot["startDate"] if earliest_slot else ""
+    if isinstance(next_available, datetime):
+        next_available = next_available.isoformat()
 
     # Handle Sr field which appears to be a nested object
     sr_no = ""
@@ -215,70 +309,98 @@ def flatten_clinician_data(c, row_number):
     scraped_field = c.get("scraped_at", {})
     if isinstance(scraped_field, dict):
         scraped_at = scraped_field.get("$date", "")
+    elif isinstance(scraped_field, datetime):
+        # tz_aware reads attach UTC; keep the naive rendering used so far
+        scraped_at = str(scraped_field.replace(tzinfo=None))
     else:
         scraped_at = str(scraped_field)
 
-    # Get NPI data
-    npi_number = c.get("NPI", "")
-    if not npi_number:
-        # Try to fetch NPI if not already in database
-        listed_in_states = c.get("Listed In States", "")
-        if listed_in_states and full_name:
-            print(f"Fetching NPI for {full_name} in {listed_in_states}")
-            npi_number = fetch_npi(full_name, listed_in_states)
-            if npi_number:
-                print(f"Found NPI for {full_name}: {npi_number}")
-
-    return {
-        "clinician_id": c.get("clinician_id", ""),
-        "Url": c.get("Url", ""),
-        "Name": c.get("Name", ""),
-        "First Name": first_name,
-        "Last Name": " ".join(full_name.split()[1:]) if full_name else "",
-        "NPI": npi_number,
-        "Profession": c.get("Profession", ""),
-        "Clinic Name": c.get("Clinic Name", ""),
-        "Bio": c.get("Bio", ""),
-        "Additional Focus Areas": c.get("Additional Focus Areas", ""),
-        "Treatment Approaches": treatment_approaches,
-        "Appointment Types": c.get("Appointment Types", ""),
-        "Communities": c.get("Communities", ""),
-        "Age Groups": c.get("Age Groups", ""),
-        "Languages": c.get("Languages", ""),
-        "Highlights": c.get("Highlights", ""),
-        "Gender": c.get("Gender", ""),
-        "Pronouns": c.get("Pronouns", ""),
-        "Race Ethnicity": c.get("Race Ethnicity", ""),
-        "Licenses": c.get("Licenses", ""),
-        "Locations": c.get("Locations", ""),
-        "Education": c.get("Education", ""),
-        "Faiths": c.get("Faiths", ""),
-        "Min Session Price": c.get("Min Session Price", ""),
-        "Max Session Price": c.get("Max Session Price", ""),
-        "Pay Out Of Pocket Status": c.get("Pay Out Of Pocket Status", ""),
-        "Individual Service Rates": c.get("Individual Service Rates", ""),
-        "General Payment Options": c.get("General Payment Options", ""),
-        "Booking Summary": (
-            f"Next availability: {next_available}"
-            if next_available
-            else c.get("Booking Summary", "")
-        ),
-        "Booking Url": c.get("Booking Url", ""),
-        "Listed In States": c.get("Listed In States", ""),
-        "States": c.get("States", ""),
-        "Listed In Websites": c.get("Listed In Websites", ""),
-        "Urls": c.get("Urls", ""),
-        "Connect Link - Facebook": c.get("Connect Link - Facebook", ""),
-        "Connect Link - Instagram": c.get("Connect Link - Instagram", ""),
-        "Connect Link - LinkedIn": c.get("Connect Link - LinkedIn", ""),
-        "Connect Link - Twitter": c.get("Connect Link - Twitter", ""),
-        "Connect Link - Website": c.get("Connect Link - Website", ""),
-        "Main Specialties": c.get("Main Specialties", ""),
-        "Accepted IPs": c.get("Accepted IPs", ""),
-        "Sr. NO": sr_no,
-        "scraped_at": scraped_at,
-        "Availability Summary": availability_summary,  # New field with formatted availability
-    }
+    # Pass-through columns are copied in column order; derived ones are
+    # filled in by position below
+    row = list(ROW_GETTER(BLANK | c))
+
+    if next_available:
+        row[COLUMN_INDEX["Booking Summary"]] = f"Next availability: {next_available}"
+
+    row[COLUMN_INDEX["First Name"]] = first_name
+    row[COLUMN_INDEX["Last Name"]] = last_name
+    row[COLUMN_INDEX["Sr. NO"]] = sr_no
+    row[COLUMN_INDEX["scraped_at"]] = scraped_at
+    row[COLUMN_INDEX["Availability Summary"]] = availability_summary
+    return tuple(row)
+
+
+def error_row(c, row_number):
+    """Minimal row kept for a clinician that failed to flatten"""
+    row = [""] * len(COLUMN_ORDER)
+    row[COLUMN_INDEX["clinician_id"]] = c.get("clinician_id", f"error_{row_number}")
+    row[COLUMN_INDEX["Name"]] = c.get("Name", "")
+    row[COLUMN_INDEX["Sr. NO"]] = row_number
+    return tuple(row)
+
+
+def flatten_row(raw_doc, row_number, now_aware):
+    """Worker entry point: decode and flatten one document without raising.
+
+    Takes the document's raw BSON bytes. Returns (row, error); error is
+    None unless the fallback row was used.
+    """
+    c = bson_decode(raw_doc, codec_options=DECODE_OPTIONS)
+    try:
+        return flatten_clinician_data(c, row_number, now_aware), None
+    except Exception as e:
+        return error_row(c, row_number), str(e)
+
+
+def iter_pages(cursor, page_size):
+    """Yield lists of up to page_size documents from the cursor"""
+    while True:
+        page = list(islice(cursor, page_size))
+        if not page:
+            return
+        yield page
+
+
+def iter_page_results(row_numbers, results):
+    """Pair a page's flatten results with their row numbers, reporting errors"""
+    for row_number, (row, error) in zip(row_numbers, results):
+        if error is not None:
+            print(f"Error processing clinician {row_number}: {error}")
+        yield row_number, row
+
+
+def iter_flattened(cursor, now_aware, executor=None, page_size=EXPORT_BATCH_SIZE):
+    """Yield (row_number, row) for every document, in cursor order.
+
+    Documents are pulled a page at a time and flattened on the executor
+    when one is given. The next page is submitted before the current one is
+    drained, so workers never idle at a page boundary; at most two pages
+    are held in memory.
+    """
+    pending = None
+    next_row = 1
+    for page in iter_pages(cursor, page_size):
+        # Ship raw BSON bytes to the workers rather than pickled dicts
+        page = [doc.raw for doc in page]
+        row_numbers = range(next_row, next_row + len(page))
+        next_row += len(page)
+        if executor is not None:
+            results = executor.map(
+                flatten_row,
+                page,
+                row_numbers,
+                repeat(now_aware),
+                chunksize=EXPORT_CHUNKSIZE,
+            )
+        else:
+            results = map(flatten_row, page, row_numbers, repeat(now_aware))
+
+        if pending is not None:
+            yield from iter_page_results(*pending)
+        pending = (row_numbers, results)
+
+    if pending is not None:
+        yield from iter_page_results(*pending)
 
 
 def export_clinicians_to_excel():
@@ -289,112 +411,149 @@ def export_clinicians_to_excel():
     total_clinicians = db.clinicians.count_documents({})
     print(f"Total clinicians in database: {total_clinicians}")
 
-    # Process in batches to avoid memory issues
-    batch_size = 2000
-    all_flattened_data = []
+    if not total_clinicians:
+        print("No clinicians found")
+        client.close()
+        return
 
-    # Use cursor with batch_size for memory efficiency
-    cursor = db.clinicians.find({}, batch_size=batch_size)
+    batch_size = EXPORT_BATCH_SIZE
 
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    parquet_file = os.path.join(OUTPUT_DIR, f"headway_{timestamp}.parquet")
+    filename = os.path.join(OUTPUT_DIR, f"headway_{timestamp}.xlsx")
+
+    # Parquet is the canonical artifact, written one row group per batch
+    parquet_writer = pq.ParquetWriter(
+        parquet_file, PARQUET_SCHEMA, compression="zstd"
+    )
+
+    # constant_memory flushes each row to disk as soon as it is written;
+    # URL-looking strings stay plain text as they did with openpyxl
+    wb = ws = None
+    if EXPORT_XLSX:
+        wb = xlsxwriter.Workbook(
+            filename, {"constant_memory": True, "strings_to_urls": False}
+        )
+        ws = wb.add_worksheet("headway")
+        ws.write_row(0, 0, COLUMN_ORDER)
+
+    # One clock read per export keeps "future" consistent across all rows
+    now_aware = datetime.now(timezone.utc)
+
+    record_count = 0
+    cursor = db.clinicians.aggregate(
+        future_slots_pipeline(now_aware), batchSize=batch_size
+    )
+
+    # Flattening is CPU-bound, so pages are fanned out to worker processes
+    executor = (
+        ProcessPoolExecutor(max_workers=EXPORT_WORKERS)
+        if EXPORT_WORKERS > 1
+        else None
+    )
+
+    # The loop only creates acyclic tuples and strings, so the cyclic
+    # collector would just rescan a growing heap for nothing
+    gc.disable()
     try:
-        for i, clinician in enumerate(cursor, 1):
-            try:
-                flattened = flatten_clinician_data(clinician, i)
-                all_flattened_data.append(flattened)
-            except Exception as e:
-                print(f"Error processing clinician {i}: {e}")
-                # Add basic data even if there's an error
-                basic_data = {
-                    "clinician_id": clinician.get("clinician_id", f"error_{i}"),
-                    "Name": clinician.get("Name", ""),
-                    "Sr. NO": i,
-                    "Error": str(e),
-                }
-                all_flattened_data.append(basic_data)
+        page_rows = []
+        for i, row in iter_flattened(cursor, now_aware, executor, batch_size):
+            if ws is not None:
+                ws.write_row(i, 0, row)
+            page_rows.append(tuple(map(to_cell_text, row)))
+            record_count = i
 
-            # Process in smaller batches and clear memory
-            if i % batch_size == 0:
-                print(f"Processed {i} clinicians...")
-                gc.collect()
+            if len(page_rows) == batch_size:
+                write_parquet_batch(parquet_writer, page_rows)
+                page_rows = []
+                print(f"Processed {record_count} clinicians...")
+
+        if page_rows:
+            write_parquet_batch(parquet_writer, page_rows)
 
     finally:
+        gc.enable()
         cursor.close()
+        parquet_writer.close()
+        if executor is not None:
+            executor.shutdown()
 
-    if not all_flattened_data:
-        print("No clinicians found")
-        client.close()
-        return
+    print(f"Parquet exported: {parquet_file} | {record_count} records")
 
-    # Column order - updated to include Availability Summary
-    column_order = [
-        "clinician_id",
-        "Url",
-        "Name",
-        "First Name",
-        "Last Name",
-        "NPI",
-        "Profession",
-        "Clinic Name",
-        "Bio",
-        "Additional Focus Areas",
-        "Treatment Approaches",
-        "Appointment Types",
-        "Communities",
-        "Age Groups",
-        "Languages",
-        "Highlights",
-        "Gender",
-        "Pronouns",
-        "Race Ethnicity",
-        "Licenses",
-        "Locations",
-        "Education",
-        "Faiths",
-        "Min Session Price",
-        "Max Session Price",
-        "Pay Out Of Pocket Status",
-        "Individual Service Rates",
-        "General Payment Options",
-        "Booking Summary",
-        "Booking Url",
-        "Listed In States",
-        "States",
-        "Listed In Websites",
-        "Urls",
-        "Connect Link - Facebook",
-        "Connect Link - Instagram",
-        "Connect Link - LinkedIn",
-        "Connect Link - Twitter",
-        "Connect Link - Website",
-        "Main Specialties",
-        "Accepted IPs",
-        "Sr. NO",
-        "scraped_at",
-        "Availability Summary",  # New column
-    ]
+    if wb is not None:
+        wb.close()
+        print(f"Excel exported: {filename} | {record_count} records")
 
-    # Create DataFrame and export
-    df = pd.DataFrame(all_flattened_data)
+    # Publish this run as the site's collection snapshot
+    update_collection_index(
+        parquet_file,
+        "headway",
+        record_count,
+        xlsx_file=filename if wb is not None else None,
+    )
 
-    # Ensure all columns exist (in case of errors)
-    for col in column_order:
-        if col not in df.columns:
-            df[col] = ""
+    client.close()
 
-    # Reorder columns
-    df = df[column_order]
 
-    # Export main Excel
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    filename = os.path.join(OUTPUT_DIR, f"headway_{timestamp}.xlsx")
-    df.to_excel(filename, index=False)
-    print(f"Excel exported: {filename} | {len(df)} records")
+def publish_snapshot(source_file, target_file):
+    """Copy a file into place atomically so readers never see a partial file"""
+    tmp_target = f"{target_file}.tmp"
+    shutil.copyfile(source_file, tmp_target)
+    os.replace(tmp_target, target_file)
 
-    # Export to collection.xlsx with safe handling
-    update_collection_file_safe(df, "headway", len(df))
 
-    client.close()
+def update_collection_index(parquet_file, website_name, record_count, xlsx_file=None):
+    """Publish a run as the site's snapshot and refresh analysis.xlsx
+
+    Only this site's files and its entry in counts.json are touched, so the
+    cost no longer grows with the number of sites in the collection.
+    """
+    os.makedirs(COLLECTION_DIR, exist_ok=True)
+    target = os.path.join(COLLECTION_DIR, f"{website_name}.parquet")
+    publish_snapshot(parquet_file, target)
+    if xlsx_file:
+        publish_snapshot(
+            xlsx_file, os.path.join(COLLECTION_DIR, f"{website_name}.xlsx")
+        )
+
+    # Per-site row counts live in a tiny registry; no snapshot is re-read
+    try:
+        with open(COUNTS_FILE, encoding="utf-8") as f:
+            counts = json.load(f)
+    except (OSError, ValueError):
+        counts = {}
+    counts[website_name] = record_count
+
+    tmp_counts = f"{COUNTS_FILE}.tmp"
+    with open(tmp_counts, "w", encoding="utf-8") as f:
+        json.dump(counts, f, indent=2, sort_keys=True)
+    os.replace(tmp_counts, COUNTS_FILE)
+
+    analysis_data = {f"Total {site}": counts[site] for site in sorted(counts)}
+    tmp_analysis = ANALYSIS_FILE.replace(".xlsx", ".tmp.xlsx")
+    with pd.ExcelWriter(tmp_analysis, engine="openpyxl") as writer:
+        pd.DataFrame([analysis_data]).to_excel(
+            writer, sheet_name="analysis", index=False
+        )
+    os.replace(tmp_analysis, ANALYSIS_FILE)
+
+    print(
+        f"Updated collection snapshot {target} | "
+        f"{record_count} {website_name} records"
+    )
+
+
+def rebuild_collection_xlsx():
+    """Write every site snapshot in COLLECTION_DIR into collection.xlsx"""
+    if not os.path.isdir(COLLECTION_DIR):
+        print(f"No collection snapshots found in {COLLECTION_DIR}")
+        return
+
+    for name in sorted(os.listdir(COLLECTION_DIR)):
+        if name.endswith(".parquet"):
+            df = pd.read_parquet(os.path.join(COLLECTION_DIR, name))
+            update_collection_file_safe(df, name[: -len(".parquet")], len(df))
 
 
 def update_collection_file_safe(df, website_name, record_count):
@@ -403,8 +562,6 @@ def update_collection_file_safe(df, website_name, record_count):
     os.makedirs("/app/exports/", exist_ok=True)
 
     try:
-        import shutil
-
         from openpyxl import load_workbook
 
         # If collection file doesn't exist, create it
@@ -422,45 +579,32 @@ def update_collection_file_safe(df, website_name, record_count):
 
         # If file exists, handle carefully
         try:
-            # Try to read existing file structure
-            existing_sheets = pd.ExcelFile(collection_file).sheet_names
-            print(f"Existing sheets: {existing_sheets}")
-
-            # Create new writer and copy all sheets except our target
-            with pd.ExcelWriter(collection_file, engine="openpyxl") as writer:
-                # Copy all existing sheets except our website sheet and analysis
-                for sheet in existing_sheets:
-                    if sheet != website_name and sheet != "analysis":
-                        try:
-                            sheet_df = pd.read_excel(
-                                collection_file, sheet_name=sheet
-                            )
-                            sheet_df.to_excel(
-                                writer, sheet_name=sheet, index=False
-                            )
-                        except Exception as e:
-                            print(
-                                f"Warning: Could not copy sheet '{sheet}': {e}"
-                            )
-
-                # Write our data
-                df.to_excel(writer, sheet_name=website_name, index=False)
-
-                # Update analysis sheet
-                analysis_data = {}
-                for sheet in existing_sheets:
-                    if sheet != "analysis" and sheet != website_name:
-                        try:
-                            sheet_df = pd.read_excel(
-                                collection_file, sheet_name=sheet
-                            )
-                            analysis_data[f"Total {sheet}"] = len(sheet_df)
-                        except:
-                            analysis_data[f"Total {sheet}"] = 0
-
-                analysis_data[f"Total {website_name}"] = record_count
-                analysis_df = pd.DataFrame([analysis_data])
-                analysis_df.to_excel(writer, sheet_name="analysis", index=False)
+            # Open the workbook in place; only our sheet and the analysis
+            # sheet are rewritten, every other site's sheet is left as is
+            wb = load_workbook(collection_file)
+            print(f"Existing sheets: {wb.sheetnames}")
+
+            for sheet in (website_name, "analysis"):
+                if sheet in wb.sheetnames:
+                    del wb[sheet]
+
+            # Write our data
+            ws = wb.create_sheet(title=website_name)
+            ws.append(list(df.columns))
+            for row in df.itertuples(index=False, name=None):
+                ws.append(row)
+
+            # Update analysis sheet from the row counts already in the workbook
+            analysis_data = {
+                f"Total {sheet}": max(wb[sheet].max_row - 1, 0)
+                for sheet in wb.sheetnames
+            }
+            analysis_data[f"Total {website_name}"] = record_count
+            analysis_ws = wb.create_sheet(title="analysis")
+            analysis_ws.append(list(analysis_data))
+            analysis_ws.append(list(analysis_data.values()))
+
+            wb.save(collection_file)
 
             print(
                 f"Updated collection.xlsx with {record_count} {website_name} records"
@@ -475,8 +619,8 @@ def update_collection_file_safe(df, website_name, record_count):
             try:
                 shutil.copy2(collection_file, backup_file)
                 print(f"Backed up corrupted file to: {backup_file}")
-            except:
-                pass
+            except OSError as backup_error:
+                print(f"Warning: Could not back up corrupted file: {backup_error}")
 
             # Create new file
             with pd.ExcelWriter(collection_file, engine="openpyxl") as writer:
@@ -496,4 +640,7 @@ def update_collection_file_safe(df, website_name, record_count):
 
 
 if __name__ == "__main__":
-    export_clinicians_to_excel()
+    if "--rebuild-collection" in sys.argv[1:]:
+        rebuild_collection_xlsx()
+    else:
+        export_clinicians_to_excel()
@@ -1,31 +1,100 @@
 import asyncio
-import json
+import logging
 import os
 import random
+import re
+import sys
 from datetime import datetime, timedelta
+from logging.handlers import RotatingFileHandler
 
+import orjson
 from playwright.async_api import async_playwright
 from pymongo import MongoClient, UpdateOne
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import ConnectionFailure, OperationFailure
+from pymongo.write_concern import WriteConcern
+
+# Per-clinician request details are logged at DEBUG and dropped at the
+# default INFO level; LOG_FILE adds a rotating file next to stdout
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "")
+log_handlers = [logging.StreamHandler(sys.stdout)]
+if LOG_FILE:
+    log_handlers.append(
+        RotatingFileHandler(LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5)
+    )
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=log_handlers,
+)
+logger = logging.getLogger(__name__)
 
 MONGO_HOST = os.getenv("MONGO_HOST", "localhost")
 MONGO_PORT = int(os.getenv("MONGO_PORT", "27017"))
 MONGO_DB = os.getenv("MONGO_DB", "headway_scraper_final")
 MONGO_USER = os.getenv("MONGO_USER", "scraper")
 MONGO_PASSWORD = os.getenv("MONGO_PASSWORD", "scraper")
+# Wire compression offered to the server, best first; zlib needs no extra package
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
 # MongoDB
 MONGO_URI = f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/{MONGO_DB}?authSource=admin"
-print(MONGO_URI)
+logger.debug(f"MongoDB URI: {MONGO_URI}")
 try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    client = MongoClient(
+        MONGO_URI, compressors=MONGO_COMPRESSORS, serverSelectionTimeoutMS=5000
+    )
     client.admin.command("ping")
-    print("[INFO] MongoDB connection successful")
+    logger.info("MongoDB connection successful")
 except ConnectionFailure as e:
-    print(f"[ERROR] MongoDB connection failed: {e}")
+    logger.error(f"MongoDB connection failed: {e}")
     exit(1)
 
 db = client[MONGO_DB]
 
+# Every upsert matches on these keys; without the indexes each one in a
+# bulk write is a collection scan
+try:
+    db.clinicians.create_index("clinician_id", unique=True)
+    db.raw_pages.create_index([("state", 1), ("page", 1)], unique=True)
+except OperationFailure as e:
+    logger.warning(f"Could not create MongoDB indexes: {e}")
+
+# Raw pages are a re-scrapable archive, so their writes skip the journal
+# wait; clinicians keep the client's default write concern
+raw_pages = db.raw_pages.with_options(write_concern=WriteConcern(w=1, j=False))
+
+# States scraped at the same time, each in its own browser context
+STATE_CONCURRENCY = int(os.getenv("STATE_CONCURRENCY", "5"))
+# Clinician upserts are buffered across pages and states, then written
+# in batches of this size. Keyed by clinician_id so a provider listed in
+# several states keeps last-write-wins even though the batch is unordered
+BULK_WRITE_THRESHOLD = int(os.getenv("BULK_WRITE_THRESHOLD", "1000"))
+pending_ops = {}
+# Availability changes every run while profile metadata rarely does, so it
+# goes out as its own narrow $set. Metadata is only re-sent when it differs
+# from what this run already queued for the clinician
+pending_availability_ops = {}
+sent_metadata = {}
+# Flushes run one at a time, so availability never overtakes the metadata
+# upsert that creates its document
+flush_lock = asyncio.Lock()
+
+# In-flight availability requests per listing page
+AVAILABILITY_CONCURRENCY = int(os.getenv("AVAILABILITY_CONCURRENCY", "10"))
+
+# Only the JSON document and API fetches are used; skip everything else
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media", "stylesheet"})
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "segment.io",
+    "segment.com",
+    "facebook.net",
+    "hotjar.com",
+    "sentry.io",
+)
+
 STATES = [
     "alaska",
     "montana",
@@ -81,7 +150,31 @@ STATES = [
 ]
 
 
-async def fetch_availability_with_playwright(page, clinician_id):
+# Linear-time tag matcher; "[^>]*" cannot backtrack across a long bio
+_TAG_RE = re.compile(r"<[^>]*>")
+
+AGE_GROUP_MAPPING = {
+    1: "Children (0-5)",
+    2: "Children (6-12)",
+    3: "Teens (13-18)",
+    4: "Adults (19-64)",
+    5: "Seniors (65+)",
+}
+
+# Specialty id -> display name, accumulated from every page's allSpecialties;
+# the list is near-identical across states, so one dict serves them all
+_SPECIALTY_CACHE = {}
+
+INSURANCE_MAPPING = {
+    1: "Aetna",
+    3: "Cigna",
+    276: "United Healthcare",
+    282: "Blue Cross Blue Shield",
+    # Add more mappings as needed based on your data
+}
+
+
+async def fetch_availability_with_playwright(request, clinician_id):
     start = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
     end = (datetime.utcnow() + timedelta(days=14)).replace(
         hour=23, minute=59, second=59, microsecond=999000
@@ -92,26 +185,23 @@ async def fetch_availability_with_playwright(page, clinician_id):
         f"?date_range_start={start}&date_range_end={end}"
         f"&is_followup_appointment=false&has_completed_intake_session=false"
     )
-    print(f"[DEBUG] Fetching availability for clinician_id={clinician_id}")
-    print(f"[DEBUG] Request URL: {url}")
+    # Lazy %-args: these run per clinician and are usually filtered out
+    logger.debug("Fetching availability for clinician_id=%s", clinician_id)
+    logger.debug("Request URL: %s", url)
 
     try:
-        data = await page.evaluate(
-            """async (url) => {
-                try {
-                    const resp = await fetch(url, { credentials: "include" });
-                    const contentType = resp.headers.get("content-type") || "";
-                    if (!contentType.includes("application/json")) {
-                        const text = await resp.text();
-                        return { error: "Unexpected content-type", content: text.substring(0, 500) };
-                    }
-                    return await resp.json();
-                } catch (err) {
-                    return { error: err.toString() };
-                }
-            }""",
-            url,
-        )
+        # Sent from the context's API client with its cookies, so nothing
+        # round-trips through the page's JavaScript
+        resp = await request.get(url)
+        try:
+            content_type = resp.headers.get("content-type", "")
+            if "application/json" in content_type:
+                data = await resp.json()
+            else:
+                text = await resp.text()
+                data = {"error": "Unexpected content-type", "content": text[:500]}
+        finally:
+            await resp.dispose()
 
         if isinstance(data, list):
             availability_count = len(data)
@@ -121,40 +211,93 @@ async def fetch_availability_with_playwright(page, clinician_id):
             availability_count = 0
 
         if "error" in data:
-            print(f"[WARN] Failed to fetch availability: {data['error']}")
+            logger.warning(f"Failed to fetch availability: {data['error']}")
             if "content" in data:
-                print(f"[DEBUG] Response preview: {data['content']}")
+                logger.debug("Response preview: %s", data["content"])
         else:
-            print(
-                f"[DEBUG] Successfully fetched availability, entries: {availability_count}"
+            logger.debug(
+                "Successfully fetched availability, entries: %d", availability_count
             )
 
         return data
 
     except Exception as e:
-        print(f"[ERROR] Exception in fetch_availability_with_playwright: {e}")
+        logger.error(f"Exception in fetch_availability_with_playwright: {e}")
         return {"error": str(e)}
 
 
-def process_clinician(c, state, all_specialties):
-    # Create mappings from the allSpecialties data
-    specialty_mapping = {
-        spec["id"]: spec["patientDisplayName"] for spec in all_specialties
-    }
+def bulk_write_ops(ops, label):
+    """Run an unordered bulk_write, returning False if it failed"""
+    try:
+        result = db.clinicians.bulk_write(ops, ordered=False)
+        logger.info(
+            f"{label}: upserted {result.upserted_count} new records, modified {result.modified_count} records"
+        )
+        return True
+    except Exception as e:
+        logger.error(
+            f"MongoDB bulk_write failed for {len(ops)} {label} records: {e}"
+        )
+        return False
+
+
+async def flush_pending_ops():
+    """Write buffered clinician metadata, then availability, as unordered bulk_writes
+
+    Both buffers are detached together on the event loop; the blocking
+    PyMongo calls then run in a worker thread so the other states keep
+    scraping while MongoDB works.
+    """
+    async with flush_lock:
+        batches = []
+        for buffer, label in (
+            (pending_ops, "Metadata"),
+            (pending_availability_ops, "Availability"),
+        ):
+            if buffer:
+                batches.append(
+                    (buffer is pending_ops, list(buffer), list(buffer.values()), label)
+                )
+                buffer.clear()
+
+        # Metadata goes first so the availability updates find the upserted docs
+        for is_metadata, clinician_ids, ops, label in batches:
+            written = await asyncio.to_thread(bulk_write_ops, ops, label)
+            if not written and is_metadata:
+                # Let the next sighting of these clinicians re-send metadata
+                for clinician_id in clinician_ids:
+                    sent_metadata.pop(clinician_id, None)
+
+
+async def flush_if_full(threshold=None):
+    pending = len(pending_ops) + len(pending_availability_ops)
+    if pending >= (threshold or BULK_WRITE_THRESHOLD):
+        await flush_pending_ops()
+
+
+async def fetch_all_availability(request, clinician_ids):
+    """Fetch availability for several clinicians at once, in input order"""
+    semaphore = asyncio.Semaphore(AVAILABILITY_CONCURRENCY)
+
+    async def bounded_fetch(clinician_id):
+        async with semaphore:
+            return await fetch_availability_with_playwright(request, clinician_id)
 
+    return await asyncio.gather(*(bounded_fetch(cid) for cid in clinician_ids))
+
+
+def process_clinician(c, state):
     # Map focusAreas IDs to names
-    focus_areas_names = []
-    for area_id in c.get("focusAreas", []):
-        focus_areas_names.append(
-            specialty_mapping.get(area_id, f"Unknown Area {area_id}")
-        )
+    focus_areas_names = [
+        _SPECIALTY_CACHE.get(area_id, f"Unknown Area {area_id}")
+        for area_id in c.get("focusAreas", [])
+    ]
 
     # Map otherSpecialties IDs to names
-    other_specialties_names = []
-    for spec_id in c.get("otherSpecialties", []):
-        other_specialties_names.append(
-            specialty_mapping.get(spec_id, f"Unknown Specialty {spec_id}")
-        )
+    other_specialties_names = [
+        _SPECIALTY_CACHE.get(spec_id, f"Unknown Specialty {spec_id}")
+        for spec_id in c.get("otherSpecialties", [])
+    ]
 
     # Combine focus areas and other specialties for "Additional Focus Areas"
     all_focus_areas = focus_areas_names + other_specialties_names
@@ -165,47 +308,31 @@ def process_clinician(c, state, all_specialties):
     treatment_approaches = c.get("modalities", [])
 
     # Map age groups
-    age_group_mapping = {
-        1: "Children (0-5)",
-        2: "Children (6-12)",
-        3: "Teens (13-18)",
-        4: "Adults (19-64)",
-        5: "Seniors (65+)",
-    }
-    age_groups_names = []
-    for age_id in c.get("treatableAgeGroups", []):
-        age_groups_names.append(
-            age_group_mapping.get(age_id, f"Unknown Age Group {age_id}")
-        )
+    age_groups_names = [
+        AGE_GROUP_MAPPING.get(age_id, f"Unknown Age Group {age_id}")
+        for age_id in c.get("treatableAgeGroups", [])
+    ]
 
     # Extract insurance information
-    insurance_ids = c.get("searchProviderLicenseState", {}).get(
-        "frontEndCarrierIds", []
-    )
-    insurance_mapping = {
-        1: "Aetna",
-        3: "Cigna",
-        276: "United Healthcare",
-        282: "Blue Cross Blue Shield",
-        # Add more mappings as needed based on your data
-    }
-    accepted_insurances = []
-    for ins_id in insurance_ids:
-        accepted_insurances.append(
-            insurance_mapping.get(ins_id, f"Insurance {ins_id}")
-        )
+    license_state = c.get("searchProviderLicenseState", {})
+    accepted_insurances = [
+        INSURANCE_MAPPING.get(ins_id, f"Insurance {ins_id}")
+        for ins_id in license_state.get("frontEndCarrierIds", [])
+    ]
 
     # Extract location information
-    locations = []
-    if c.get("searchProviderLicenseState", {}).get("locations"):
-        for loc in c["searchProviderLicenseState"]["locations"]:
-            locations.append(
-                f"{loc.get('streetAddress', '')}, {loc.get('state', '')}"
-            )
+    locations = [
+        f"{loc.get('streetAddress', '')}, {loc.get('state', '')}"
+        for loc in license_state.get("locations") or []
+    ]
+
+    # Shared by several columns below; built once per clinician
+    profile_url = f"https://care.headway.co/providers/{c.get('slug', '')}"
+    ethnicity = ", ".join(c.get("ethnicity", []))
 
     return {
         "clinician_id": c.get("providerId"),
-        "Url": f"https://care.headway.co/providers/{c.get('slug', '')}",
+        "Url": profile_url,
         "Name": c.get("displayName"),
         "NPI": c.get("npiNumber"),  # Note: This field might not be in your data
         "Profession": c.get("patientViewableProviderType"),
@@ -220,13 +347,13 @@ def process_clinician(c, state, all_specialties):
             map(str, treatment_approaches)
         ),  # Would need modalities mapping
         "Appointment Types": "Telehealth",  # Based on telehealthAvailabilityCount > 0
-        "Communities": ", ".join(c.get("ethnicity", [])),
+        "Communities": ethnicity,
         "Age Groups": ", ".join(age_groups_names),
         "Languages": ", ".join(c.get("languages", [])),
         "Highlights": ", ".join(c.get("styleTags", [])),
         "Gender": c.get("gender"),
         "Pronouns": c.get("pronouns"),
-        "Race Ethnicity": ", ".join(c.get("ethnicity", [])),
+        "Race Ethnicity": ethnicity,
         "Licenses": c.get("licenseType", ""),
         "Locations": (
             "; ".join(locations) if locations else c.get("location", "")
@@ -241,7 +368,7 @@ def process_clinician(c, state, all_specialties):
         "Individual Service Rates": "",  # Not in your data
         "General Payment Options": "Insurance",  # Based on frontEndCarrierIds
         "Booking Summary": f"Next availability: {c.get('nextAvailabilityDateWithinTwoWeeks', '')}",
-        "Booking Url": f"https://care.headway.co/providers/{c.get('slug', '')}",
+        "Booking Url": profile_url,
         "Listed In States": ", ".join(
             [
                 state.get("state", "")
@@ -263,124 +390,164 @@ def process_clinician(c, state, all_specialties):
     }
 
 
+async def block_heavy_resources(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        host in request.url for host in BLOCKED_HOSTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
 def clean_html(text):
     """Remove HTML tags from text"""
-    if not text:
-        return ""
-    import re
+    return _TAG_RE.sub("", text) if text else ""
 
-    clean = re.compile("<.*?>")
-    return re.sub(clean, "", text)
 
+async def scrape_state(context, page, state, currentPage=1):
+    logger.info(f"--- Starting scrape for {state} ---")
 
-async def scrape_state(state, currentPage=1):
-    print(f"--- Starting scrape for {state} ---")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-blink-features=AutomationControlled",
-            ],
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-        )
-        page = await context.new_page()
+    url = f"https://care.headway.co/therapists/{state}?page={currentPage}&_data=routes%2FseoDirectory%2Flocations"
+    if currentPage == 1:
+        url = f"https://care.headway.co/therapists/{state}?_data=routes%2FseoDirectory%2Flocations"
 
-        url = f"https://care.headway.co/therapists/{state}?page={currentPage}&_data=routes%2FseoDirectory%2Flocations"
+    logger.info(f"Navigating to URL: {url}")
+    try:
         if currentPage == 1:
-            url = f"https://care.headway.co/therapists/{state}?_data=routes%2FseoDirectory%2Flocations"
-
-        print(f"[INFO] Navigating to URL: {url}")
-        try:
+            # The first page goes through the browser so the context picks up
+            # the site's cookies for the API requests that follow
             response = await page.goto(url, wait_until="domcontentloaded")
-            print(
-                f"[INFO] HTTP response status: {response.status if response else 'No response'}"
-            )
-        except Exception as e:
-            print(f"[ERROR] Failed to load page for {state}: {e}")
-            await browser.close()
-            return 0
+        else:
+            # Later pages are plain JSON; fetch them with the context's
+            # cookies instead of rendering another document
+            response = await context.request.get(url)
+        logger.info(
+            f"HTTP response status: {response.status if response else 'No response'}"
+        )
+    except Exception as e:
+        logger.error(f"Failed to load page for {state}: {e}")
+        return 0
+
+    if not response:
+        logger.warning(f"No response body for {state}")
+        return 0
 
+    try:
+        content = await response.body()
+        logger.info(f"Extracted JSON content, length: {len(content)} bytes")
+        data = orjson.loads(content)
+    except Exception as e:
+        logger.error(f"Failed to extract/parse JSON for {state}: {e}")
+        return 0
+
+    clinicians = data.get("topProviders", [])
+    all_specialties = data.get("allSpecialties", [])
+    logger.info(f"Found {len(clinicians)} clinician records for {state}")
+    totalPages = data.get("totalPages", 1)
+    logger.info(f"Found {totalPages} Total Pages for {state}")
+
+    # Fold this page's allSpecialties into the mapping shared by all states
+    _SPECIALTY_CACHE.update(
+        (spec["id"], spec["patientDisplayName"]) for spec in all_specialties
+    )
+    batch = [process_clinician(c, state) for c in clinicians]
+
+    # Fetch availability for all clinicians on the page concurrently
+    availabilities = await fetch_all_availability(
+        context.request, [c["clinician_id"] for c in batch]
+    )
+
+    if batch:
+        for c, availability in zip(batch, availabilities):
+            clinician_id = c["clinician_id"]
+            # scraped_at changes on every call, so it is left out of the key
+            metadata_key = hash(
+                orjson.dumps([v for k, v in c.items() if k != "scraped_at"])
+            )
+            if sent_metadata.get(clinician_id) != metadata_key:
+                sent_metadata[clinician_id] = metadata_key
+                update = {"$set": c}
+                # Headway rarely sends an NPI; keep one set by backfill_npi.py
+                if not c.get("NPI"):
+                    update = {
+                        "$set": {k: v for k, v in c.items() if k != "NPI"},
+                        "$setOnInsert": {"NPI": c.get("NPI")},
+                    }
+                pending_ops[clinician_id] = UpdateOne(
+                    {"clinician_id": clinician_id},
+                    update,
+                    upsert=True,
+                )
+            pending_availability_ops[clinician_id] = UpdateOne(
+                {"clinician_id": clinician_id},
+                {"$set": {"availability": availability}},
+            )
+        await flush_if_full()
         try:
-            pre = await page.query_selector("pre")
-            if not pre:
-                print(f"[WARN] No JSON <pre> tag found for {state}")
-                await browser.close()
-                return 0
-
-            content = await pre.text_content()
-            print(
-                f"[INFO] Extracted JSON content, length: {len(content)} characters"
+            raw_doc = {
+                "state": state,
+                "page": currentPage,
+                "scraped_at": datetime.utcnow(),
+                "raw_data": data,
+            }
+            # PyMongo blocks; a worker thread keeps the other states moving
+            await asyncio.to_thread(
+                raw_pages.update_one,
+                {"state": state, "page": currentPage},
+                {"$set": raw_doc},
+                upsert=True,
             )
-            data = json.loads(content)
         except Exception as e:
-            print(f"[ERROR] Failed to extract/parse JSON for {state}: {e}")
-            await browser.close()
-            return 0
-
-        clinicians = data.get("topProviders", [])
-        all_specialties = data.get("allSpecialties", [])
-        print(f"[INFO] Found {len(clinicians)} clinician records for {state}")
-        totalPages = data.get("totalPages", 1)
-        print(f"[INFO] Found {totalPages} Total Pages for {state}")
-
-        batch = [
-            process_clinician(c, state, all_specialties) for c in clinicians
-        ]
-
-        # Fetch availability for each clinician
-        for c in batch:
-            c["availability"] = await fetch_availability_with_playwright(
-                page, c["clinician_id"]
-            )
+            logger.error(f"MongoDB raw page write failed for {state}: {e}")
+
+    logger.info(f"--- Finished scrape for {state}, total saved: {len(batch)} ---")
+    return totalPages - currentPage
 
-        if batch:
-            try:
-                ops = [
-                    UpdateOne(
-                        {"clinician_id": c["clinician_id"]},
-                        {"$set": c},
-                        upsert=True,
-                    )
-                    for c in batch
-                ]
-                result = db.clinicians.bulk_write(ops, ordered=False)
-                print(
-                    f"[INFO] Upserted {result.upserted_count} new records, modified {result.modified_count} records"
-                )
-                raw_doc = {
-                    "state": state,
-                    "page": currentPage,
-                    "scraped_at": datetime.utcnow(),
-                    "raw_data": data,
-                }
-                db.raw_pages.update_one(
-                    {"state": state, "page": currentPage},
-                    {"$set": raw_doc},
-                    upsert=True,
-                )
-            except Exception as e:
-                print(f"[ERROR] MongoDB bulk_write failed for {state}: {e}")
 
-        await browser.close()
-        print(
-            f"--- Finished scrape for {state}, total saved: {len(batch)} ---\n"
+async def scrape_all_pages(browser, state, semaphore):
+    async with semaphore:
+        # One context per state, reused for every page of that state
+        context = await browser.new_context(
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+            viewport={"width": 1280, "height": 800},
         )
-        return totalPages - currentPage
+        await context.route("**/*", block_heavy_resources)
+        try:
+            tab = await context.new_page()
+            page = 1
+            pagesLeft = 1
+            while pagesLeft > 0:
+                pagesLeft = await scrape_state(context, tab, state, page)
+                page += 1
+        finally:
+            await context.close()
+        await asyncio.sleep(random.uniform(2, 5))
 
 
 async def main():
-    for state in STATES:
-        page = 1
-        pagesLeft = 1
-        while pagesLeft > 0:
-            pagesLeft = await scrape_state(state, page)
-            page += 1
-        await asyncio.sleep(random.uniform(2, 5))
-    print("All done!")
+    # One Chromium for the whole run; each state gets its own context
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(
+            headless=True,
+            args=[
+                "--no-sandbox",
+                "--disable-blink-features=AutomationControlled",
+            ],
+        )
+        semaphore = asyncio.Semaphore(STATE_CONCURRENCY)
+        try:
+            results = await asyncio.gather(
+                *[scrape_all_pages(browser, state, semaphore) for state in STATES],
+                return_exceptions=True,
+            )
+            for state, result in zip(STATES, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Scrape failed for {state}: {result}")
+        finally:
+            await browser.close()
+            await flush_pending_ops()
+    logger.info("All done!")
 
 
 if __name__ == "__main__":
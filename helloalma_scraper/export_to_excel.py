@@ -1,7 +1,11 @@
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
 
 import pandas as pd
+import xlsxwriter
 from pymongo import MongoClient
 
 MONGO_HOST = os.getenv("MONGO_HOST", "mongodb")
@@ -10,6 +14,36 @@ MONGO_DB = os.getenv("MONGO_DB", "heloalma_scraper_final")
 MONGO_USER = os.getenv("MONGO_USER", "scraper")
 MONGO_PASSWORD = os.getenv("MONGO_PASSWORD", "scraper")
 OUTPUT_DIR = "./exports/helloalma"
+# Worker processes for flattening; 1 keeps everything in-process
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(os.cpu_count() or 1)))
+# Documents handed to a worker per IPC round-trip
+EXPORT_CHUNKSIZE = int(os.getenv("EXPORT_CHUNKSIZE", "500"))
+
+# Only the fields flatten_clinician_data reads; skips availability and raw
+# payloads stored alongside each clinician
+PROJECTION = {
+    "_id": 0,
+    **{
+        field: 1
+        for field in [
+            "clinician_id",
+            "first_name",
+            "last_name",
+            "title",
+            "bio_about_you",
+            "bio_therapy_approach",
+            "focus_areas",
+            "telehealth",
+            "languages",
+            "style_tags",
+            "ethnicity",
+            "location",
+            "active_states",
+            "location_state",
+            "profile_img",
+        ]
+    },
+}
 
 
 def get_mongo_client():
@@ -18,16 +52,19 @@ def get_mongo_client():
 
 
 def flatten_clinician_data(c):
+    # Each of these fills two columns; join once per row
+    titles = ", ".join(c.get("title", []))
+    focus_areas = ", ".join(map(str, c.get("focus_areas", [])))
     return {
         "clinician_id": c.get("clinician_id", ""),
         "Url": "",
         "Name": f"{c.get('first_name', '')} {c.get('last_name', '')}".strip(),
-        "Profession": ", ".join(c.get("title", [])),
+        "Profession": titles,
         "Clinic Name": "",
         "Bio": (c.get("bio_about_you", "") or "")
         + " "
         + (c.get("bio_therapy_approach", "") or ""),
-        "Additional Focus Areas": ", ".join(map(str, c.get("focus_areas", []))),
+        "Additional Focus Areas": focus_areas,
         "Treatment Approaches": "humanistic, cognitive-behavioral, developmental, solution-focused, holistic, trauma-informed, strengths-based",
         "Appointment Types": "telehealth" if c.get("telehealth") else "",
         "Communities": "",
@@ -37,7 +74,7 @@ def flatten_clinician_data(c):
         "Gender": "",
         "Pronouns": "",
         "Race Ethnicity": ", ".join(c.get("ethnicity", [])),
-        "Licenses": ", ".join(c.get("title", [])),
+        "Licenses": titles,
         "Locations": c.get("location", ""),
         "Education": "",
         "Faiths": "",
@@ -59,29 +96,68 @@ def flatten_clinician_data(c):
         "Connect Link - LinkedIn": "",
         "Connect Link - Twitter": "",
         "Connect Link - Website": "",
-        "Main Specialties": ", ".join(map(str, c.get("focus_areas", []))),
+        "Main Specialties": focus_areas,
         "Accepted IPs": "",
         "Sr. NO": "",
     }
 
 
+def flatten_batch(clinicians):
+    return [flatten_clinician_data(c) for c in clinicians]
+
+
+def flatten_cursor(cursor):
+    """
+    Yield flattened rows for every clinician read from cursor, in order
+
+    Batches of EXPORT_CHUNKSIZE documents are flattened across
+    EXPORT_WORKERS processes. Only a couple of batches per worker are in
+    flight, so the cursor is not drained into memory ahead of the rows.
+    """
+    batches = iter(lambda: list(islice(cursor, EXPORT_CHUNKSIZE)), [])
+    if EXPORT_WORKERS <= 1:
+        for batch in batches:
+            yield from flatten_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(flatten_batch, batch))
+            if len(pending) >= EXPORT_WORKERS * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
 def export_clinicians_to_excel():
     client = get_mongo_client()
     db = client[MONGO_DB]
-    clinicians = list(db.clinicians.find())
-    if not clinicians:
+
+    # Rows are flattened straight off the cursor; no list of raw documents
+    cursor = db.clinicians.find({}, PROJECTION, batch_size=1000)
+    # Flattening is CPU-bound Python, so it is spread across processes
+    df = pd.DataFrame.from_records(flatten_cursor(cursor))
+    if df.empty:
         print("No clinicians found")
+        client.close()
         return
 
-    flattened = [flatten_clinician_data(c) for c in clinicians]
-    for i, f in enumerate(flattened, start=1):
-        f["Sr. NO"] = i
-
-    df = pd.DataFrame(flattened)
+    df["Sr. NO"] = range(1, len(df) + 1)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     filename = os.path.join(OUTPUT_DIR, f"headway_{timestamp}.xlsx")
-    df.to_excel(filename, index=False)
+    # constant_memory flushes each row to disk as soon as it is written;
+    # rows go through write_row because pandas writes column by column,
+    # which constant_memory mode cannot take
+    wb = xlsxwriter.Workbook(
+        filename, {"constant_memory": True, "strings_to_urls": False}
+    )
+    ws = wb.add_worksheet()
+    ws.write_row(0, 0, df.columns)
+    for i, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        ws.write_row(i, 0, row)
+    wb.close()
     print(f"Excel exported: {filename} | {len(df)} records")
     client.close()
 
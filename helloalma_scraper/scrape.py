@@ -1,17 +1,24 @@
-import json
+import asyncio
+import gc
 import logging
 import os
 import pickle
+import random
 import sys
 import time
 import uuid
 from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 
+import aiohttp
+import msgpack
+import orjson
 import pandas as pd
-import requests
-from pymongo import MongoClient
+from aiolimiter import AsyncLimiter
+from openpyxl import Workbook
+from pymongo import MongoClient, UpdateOne
+from pymongo.write_concern import WriteConcern
 
 # Configure beautiful logging
 logging.basicConfig(
@@ -23,6 +30,69 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+NPI_API_URL = "https://npiregistry.cms.hhs.gov/api/"
+# Throttling and transient gateway errors that are worth retrying
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+MAX_BACKOFF_SECONDS = 60
+
+# msgpack has no naive-datetime type; scraped_at travels as an ext record
+MSGPACK_DATETIME_EXT = 1
+# Filterable slug prefixes read by process_provider_data. They are grouped
+# by their first "_" token so each slug is checked against one or two
+# candidates instead of every prefix
+FILTERABLE_PREFIXES = (
+    "specialty_v2_",
+    "modality_",
+    "service_",
+    "ages_served_",
+    "language_",
+    "identity_gender_",
+    "identity_race_",
+)
+_PREFIXES_BY_HEAD = {}
+for _prefix in FILTERABLE_PREFIXES:
+    _PREFIXES_BY_HEAD.setdefault(_prefix.split("_", 1)[0], []).append(_prefix)
+# Filterable slugs process_provider_data checks for an exact match
+FILTERABLE_SLUGS = frozenset({"payment_out_of_pocket"})
+
+# Canonical insurance names keyed by the substring that identifies them,
+# checked in this order; "united" also needs "health" in the name
+INSURANCE_CANON = {
+    "aetna": "Aetna",
+    "cigna": "Cigna",
+    "united": "United Healthcare",
+    "oxford": "Oxford Health Plans",
+    "optum": "Optum",
+}
+
+# Appended backup records between compactions of the local backup file
+BACKUP_COMPACT_EVERY = 5000
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(MSGPACK_DATETIME_EXT, obj.isoformat().encode())
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _msgpack_ext_hook(code, data):
+    if code == MSGPACK_DATETIME_EXT:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _write_xlsx(df: pd.DataFrame, filename: str) -> None:
+    """Stream a DataFrame to an .xlsx file one row at a time."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    # Missing values become blank cells, as DataFrame.to_excel writes them
+    for row in df.astype(object).where(df.notna(), None).itertuples(
+        index=False, name=None
+    ):
+        ws.append(row)
+    wb.save(filename)
+
 
 class AlmaTherapistScraper:
     """
@@ -37,6 +107,11 @@ class AlmaTherapistScraper:
         username: str = None,
         password: str = None,
         use_mongodb: bool = True,
+        bulk_write_size: int = 500,
+        max_concurrency: int = 64,
+        alma_requests_per_second: float = 10,
+        npi_requests_per_second: float = 10,
+        max_retries: int = 5,
     ):
         """
         Initialize the Alma Therapist Scraper with MongoDB connection or local storage.
@@ -47,6 +122,11 @@ class AlmaTherapistScraper:
             username: MongoDB username (optional)
             password: MongoDB password (optional)
             use_mongodb: Whether to use MongoDB or local storage
+            bulk_write_size: Buffered upserts sent per MongoDB bulk_write
+            max_concurrency: Availability/NPI requests in flight at once
+            alma_requests_per_second: Request rate allowed against the Alma API
+            npi_requests_per_second: Request rate allowed against the NPI registry
+            max_retries: Retries for a request answered with 429 or a 5xx gateway error
         """
         logger.info("🏁 Initializing Alma Therapist Scraper...")
         logger.info(
@@ -54,8 +134,42 @@ class AlmaTherapistScraper:
         )
 
         self.use_mongodb = use_mongodb
-        self.local_data = []
-        self.local_backup_file = "alma_therapists_backup.pkl"
+        # Local records keyed by Sr. NO, in the order they were last stored
+        self._local_records: Dict[Any, Dict] = {}
+        # Newest scraped_at among local records, kept up to date on store
+        self._latest_local_scrape: Optional[datetime] = None
+        self.local_backup_file = "alma_therapists_backup.msgpack"
+        # Read once to migrate backups written before the msgpack switch
+        self.legacy_backup_file = "alma_therapists_backup.pkl"
+        # store_data appends one record per provider; the file is rewritten
+        # from local_data only on compaction
+        self._backup_fp = None
+        self._backup_appends = 0
+
+        # NPI answers keyed by (first, last, states); kept across runs
+        self.npi_cache_file = "alma_npi_cache.msgpack"
+        self._npi_cache = self.load_npi_cache()
+        self._npi_cache_dirty = False
+        # Providers share a handful of rate strings; each is parsed once
+        self._rate_cache: Dict[str, tuple] = {}
+        # Display name per insurance slug
+        self._insurance_name_cache: Dict[str, str] = {}
+        # Availability keys repeat across providers; each is parsed once
+        self._availability_days: Dict[str, Optional[date]] = {}
+        self._booking_labels: Dict[str, Optional[str]] = {}
+        # (slug, date) pairs the availability endpoint answered with 404;
+        # keyed by date so a miss is retried the next day
+        self._availability_misses = set()
+        self.bulk_write_size = bulk_write_size
+        self.max_concurrency = max_concurrency
+        self.alma_requests_per_second = alma_requests_per_second
+        self.npi_requests_per_second = npi_requests_per_second
+        self.max_retries = max_retries
+        # Per-host limiters; rebuilt for every event loop in open_http_session
+        self._limiters = {}
+        # Pending upserts keyed by Sr. NO, so a repeat within a batch keeps
+        # the latest record even though the batch is sent unordered
+        self._pending_ops = {}
 
         if self.use_mongodb:
             logger.info(f"💾 MongoDB URI: {mongo_uri}")
@@ -76,7 +190,11 @@ class AlmaTherapistScraper:
                 # Test connection
                 self.client.admin.command("ping")
                 self.db = self.client[db_name]
-                self.collection = self.db["therapists"]
+                # Records can always be re-scraped, so writes skip the
+                # journal wait
+                self.collection = self.db["therapists"].with_options(
+                    write_concern=WriteConcern(w=1, j=False)
+                )
                 logger.info("✅ MongoDB connection established successfully")
 
             except Exception as e:
@@ -89,33 +207,86 @@ class AlmaTherapistScraper:
             self.local_data = self.load_local_backup()
 
         self.base_url = "https://secure.helloalma.com"
-        self.session = requests.Session()
 
         # Set headers to mimic a real browser
-        self.session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Accept": "application/json",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://helloalma.com/",
-            }
-        )
+        self.headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+            "Accept": "application/json",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Referer": "https://helloalma.com/",
+        }
 
         logger.info("✅ HTTP session configured with proper headers")
 
+    @property
+    def local_data(self) -> List[Dict]:
+        """Locally stored records, oldest first."""
+        return list(self._local_records.values())
+
+    @local_data.setter
+    def local_data(self, records: List[Dict]):
+        self._local_records = {}
+        self._latest_local_scrape = None
+        for record in records:
+            self._store_local_record(record)
+
+    def _store_local_record(self, record: Dict):
+        """Keep record as the newest local entry for its Sr. NO."""
+        sr_no = record.get("Sr. NO")
+        self._local_records.pop(sr_no, None)
+        self._local_records[sr_no] = record
+        scraped_at = record.get("scraped_at")
+        if scraped_at is not None and (
+            self._latest_local_scrape is None
+            or scraped_at > self._latest_local_scrape
+        ):
+            self._latest_local_scrape = scraped_at
+
     def load_local_backup(self) -> List[Dict]:
         """
         Load data from local backup file if it exists.
 
+        The file is a stream of packed records; a later record with the same
+        Sr. NO replaces the earlier one. A truncated final record left by a
+        crash is ignored.
+
         Returns:
             List of previously saved therapist data
         """
         try:
             if os.path.exists(self.local_backup_file):
-                with open(self.local_backup_file, "rb") as f:
-                    data = pickle.load(f)
+                records = {}
+                # Unpacking only builds acyclic dicts and lists
+                gc_was_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    with open(self.local_backup_file, "rb") as f:
+                        unpacker = msgpack.Unpacker(
+                            f,
+                            raw=False,
+                            ext_hook=_msgpack_ext_hook,
+                            max_buffer_size=0,
+                        )
+                        for item in unpacker:
+                            # Older backups hold the whole list as one object
+                            batch = item if isinstance(item, list) else (item,)
+                            for record in batch:
+                                sr_no = record.get("Sr. NO")
+                                records.pop(sr_no, None)
+                                records[sr_no] = record
+                finally:
+                    if gc_was_enabled:
+                        gc.enable()
+                data = list(records.values())
                 logger.info(f"📂 Loaded {len(data)} records from local backup")
                 return data
+            elif os.path.exists(self.legacy_backup_file):
+                with open(self.legacy_backup_file, "rb") as f:
+                    data = pickle.load(f)
+                logger.info(
+                    f"📂 Loaded {len(data)} records from legacy pickle backup; the next save writes {self.local_backup_file}"
+                )
+                return data
             else:
                 logger.info(
                     "📂 No local backup found, starting with empty dataset"
@@ -126,16 +297,91 @@ class AlmaTherapistScraper:
             return []
 
     def save_local_backup(self):
-        """Save data to local backup file."""
+        """Rewrite the local backup file from local_data, dropping stale records."""
         try:
-            with open(self.local_backup_file, "wb") as f:
-                pickle.dump(self.local_data, f)
+            self.close_backup_file()
+            tmp_file = f"{self.local_backup_file}.tmp"
+            packer = msgpack.Packer(default=_msgpack_default, use_bin_type=True)
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                with open(tmp_file, "wb") as f:
+                    for record in self._local_records.values():
+                        f.write(packer.pack(record))
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+            os.replace(tmp_file, self.local_backup_file)
+            self._backup_appends = 0
             logger.info(
-                f"💾 Saved {len(self.local_data)} records to local backup"
+                f"💾 Saved {len(self._local_records)} records to local backup"
             )
         except Exception as e:
             logger.error(f"❌ Error saving local backup: {e}")
 
+    def append_local_backup(self, record: Dict):
+        """Append one record to the local backup file, compacting it now and then."""
+        if self._backup_fp is None:
+            if not os.path.exists(self.local_backup_file):
+                # First write after a fresh start or a pickle migration
+                self.save_local_backup()
+                return
+            self._backup_fp = open(self.local_backup_file, "ab")
+
+        self._backup_fp.write(
+            msgpack.packb(record, default=_msgpack_default, use_bin_type=True)
+        )
+        self._backup_fp.flush()
+        self._backup_appends += 1
+        if self._backup_appends >= BACKUP_COMPACT_EVERY:
+            self.save_local_backup()
+
+    def close_backup_file(self):
+        """Close the append handle on the local backup file, if open."""
+        if self._backup_fp is not None:
+            self._backup_fp.close()
+            self._backup_fp = None
+
+    def load_npi_cache(self) -> Dict[tuple, str]:
+        """
+        Load NPI lookups saved by earlier runs.
+
+        Returns:
+            Mapping of (first_name, last_name, states) to NPI number
+        """
+        try:
+            if not os.path.exists(self.npi_cache_file):
+                return {}
+            with open(self.npi_cache_file, "rb") as f:
+                entries = msgpack.unpackb(f.read(), raw=False)
+            cache = {
+                (first, last, frozenset(states)): npi
+                for first, last, states, npi in entries
+            }
+            logger.info(f"📂 Loaded {len(cache)} cached NPI lookups")
+            return cache
+        except Exception as e:
+            logger.error(f"❌ Error loading NPI cache: {e}")
+            return {}
+
+    def save_npi_cache(self):
+        """Write the NPI lookup cache to disk if it gained entries."""
+        if not self._npi_cache_dirty:
+            return
+        try:
+            entries = [
+                [first, last, sorted(states), npi]
+                for (first, last, states), npi in self._npi_cache.items()
+            ]
+            tmp_file = f"{self.npi_cache_file}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(msgpack.packb(entries, use_bin_type=True))
+            os.replace(tmp_file, self.npi_cache_file)
+            self._npi_cache_dirty = False
+            logger.info(f"💾 Saved {len(entries)} cached NPI lookups")
+        except Exception as e:
+            logger.error(f"❌ Error saving NPI cache: {e}")
+
     def store_data(self, processed_data: Dict) -> bool:
         """
         Store processed data in MongoDB or local storage.
@@ -148,46 +394,159 @@ class AlmaTherapistScraper:
         """
         try:
             if self.use_mongodb:
-                result = self.collection.update_one(
+                self._pending_ops[processed_data["Sr. NO"]] = UpdateOne(
                     {"Sr. NO": processed_data["Sr. NO"]},
                     {"$set": processed_data},
                     upsert=True,
                 )
-
-                if result.upserted_id:
-                    logger.debug(
-                        f"💾 New MongoDB record inserted for {processed_data['Name']}"
-                    )
-                else:
-                    logger.debug(
-                        f"🔄 Existing MongoDB record updated for {processed_data['Name']}"
-                    )
+                logger.debug(
+                    "💾 MongoDB upsert queued for %s", processed_data['Name']
+                )
+                if len(self._pending_ops) >= self.bulk_write_size:
+                    return self.flush()
             else:
-                # Local storage - remove existing record if present and add new one
-                self.local_data = [
-                    data
-                    for data in self.local_data
-                    if data.get("Sr. NO") != processed_data["Sr. NO"]
-                ]
-                self.local_data.append(processed_data)
-                self.save_local_backup()
+                # Local storage - replace any existing record for this Sr. NO
+                self._store_local_record(processed_data)
+                self.append_local_backup(processed_data)
                 logger.debug(
-                    f"💾 Local record stored for {processed_data['Name']}"
+                    "💾 Local record stored for %s", processed_data['Name']
                 )
 
             return True
 
         except Exception as e:
-            logger.error(f"❌ Storage failed for {processed_data['Name']}: {e}")
+            logger.error(
+                "❌ Storage failed for %s: %s", processed_data['Name'], e
+            )
             return False
 
+    def flush(self) -> bool:
+        """
+        Send buffered MongoDB upserts in one unordered bulk_write.
+
+        Returns:
+            True if the write succeeded or nothing was pending, False otherwise
+        """
+        if not self._pending_ops:
+            return True
+
+        ops = list(self._pending_ops.values())
+        self._pending_ops.clear()
+        try:
+            result = self.collection.bulk_write(ops, ordered=False)
+            logger.info(
+                "💾 Bulk write: %s inserted, %s updated",
+                result.upserted_count,
+                result.modified_count,
+            )
+            return True
+        except Exception as e:
+            logger.error("❌ Bulk write failed for %s records: %s", len(ops), e)
+            return False
+
+    def open_http_session(self) -> aiohttp.ClientSession:
+        """
+        Create the aiohttp session shared by every request in a scrape.
+
+        Returns:
+            Client session with the browser headers and a keep-alive pool
+        """
+        # Both APIs are reached through this one pool: idle connections stay
+        # open between pages and DNS answers are reused instead of being
+        # looked up per request
+        connector = aiohttp.TCPConnector(
+            limit=2 * self.max_concurrency,
+            limit_per_host=self.max_concurrency,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+        )
+        # Concurrency alone would burst; a token bucket per host keeps each
+        # API at its own sustained rate
+        self._limiters = {
+            urlsplit(NPI_API_URL).hostname: AsyncLimiter(
+                self.npi_requests_per_second, 1
+            ),
+            urlsplit(self.base_url).hostname: AsyncLimiter(
+                self.alma_requests_per_second, 1
+            ),
+        }
+        # No Accept-Encoding here: aiohttp offers gzip and deflate, plus br
+        # when Brotli is installed, and only what it can decode
+        return aiohttp.ClientSession(headers=self.headers, connector=connector)
+
+    async def http_get(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: float = 30,
+    ) -> aiohttp.ClientResponse:
+        """
+        GET a URL under its host's rate limit, retrying throttled responses.
+
+        Responses with a status in RETRY_STATUSES are retried up to
+        max_retries times, waiting for Retry-After when the server sends it
+        and for an exponential backoff with jitter otherwise.
+
+        Args:
+            session: Shared aiohttp session
+            url: Request URL
+            params: Query parameters
+            timeout: Total timeout per attempt in seconds
+
+        Returns:
+            The final response, with its body already read
+        """
+        limiter = self._limiters.get(urlsplit(url).hostname)
+        for attempt in range(self.max_retries + 1):
+            if limiter is not None:
+                await limiter.acquire()
+            async with session.get(
+                url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                await response.read()
+            if (
+                response.status not in RETRY_STATUSES
+                or attempt == self.max_retries
+            ):
+                return response
+
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = min(MAX_BACKOFF_SECONDS, int(retry_after))
+            else:
+                delay = min(MAX_BACKOFF_SECONDS, 2**attempt) + random.random()
+            logger.warning(
+                "🔁 %s from %s, retry %s/%s in %.1fs",
+                response.status,
+                urlsplit(url).hostname,
+                attempt + 1,
+                self.max_retries,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+    async def _call_with_session(self, method, *args):
+        """Run one async fetch method inside a short-lived session."""
+        async with self.open_http_session() as session:
+            return await method(session, *args)
+
     def fetch_provider_list(
         self, page: int = 1, limit: int = 15
+    ) -> Optional[Dict]:
+        """Synchronous wrapper around fetch_provider_list_async."""
+        return asyncio.run(
+            self._call_with_session(self.fetch_provider_list_async, page, limit)
+        )
+
+    async def fetch_provider_list_async(
+        self, session: aiohttp.ClientSession, page: int = 1, limit: int = 15
     ) -> Optional[Dict]:
         """
         Fetch the list of providers from Alma API with pagination.
 
         Args:
+            session: Shared aiohttp session
             page: Page number to fetch
             limit: Number of results per page
 
@@ -197,21 +556,25 @@ class AlmaTherapistScraper:
         url = f"{self.base_url}/api/v1/providerProfiles/search/"
         params = {"page": page, "limit": limit}
 
-        logger.info(f"🌐 Fetching provider list - Page {page}, Limit {limit}")
-        logger.debug(f"📡 API URL: {url}")
-        logger.debug(f"🔧 Parameters: {params}")
+        logger.info("🌐 Fetching provider list - Page %s, Limit %s", page, limit)
+        logger.debug("📡 API URL: %s", url)
+        logger.debug("🔧 Parameters: %s", params)
 
         try:
             start_time = time.time()
-            response = self.session.get(url, params=params, timeout=30)
+            response = await self.http_get(session, url, params, timeout=30)
             response_time = time.time() - start_time
 
             logger.info(
-                f"📥 Response received in {response_time:.2f}s - Status: {response.status_code}"
+                "📥 Response received in %.2fs - Status: %s",
+                response_time,
+                response.status,
             )
 
-            if response.status_code == 200:
-                data = response.json()
+            if response.status == 200:
+                data = await response.json(
+                    loads=orjson.loads, content_type=None
+                )
                 total_count = data.get("count", 0)
                 results_count = len(data.get("results", []))
                 additional_count = len(data.get("additionalResults", []))
@@ -222,34 +585,50 @@ class AlmaTherapistScraper:
                 return data
             else:
                 logger.warning(
-                    f"⚠️  Non-200 response: {response.status_code} - {response.text[:100]}..."
+                    "⚠️  Non-200 response: %s - %s...",
+                    response.status,
+                    (await response.text())[:100],
                 )
                 return None
 
-        except requests.exceptions.Timeout:
+        except asyncio.TimeoutError:
             logger.error("⏰ Request timeout while fetching provider list")
             return None
-        except requests.exceptions.ConnectionError:
+        except aiohttp.ClientConnectionError:
             logger.error("🔌 Connection error while fetching provider list")
             return None
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientError as e:
             logger.error(
-                f"❌ Request exception while fetching provider list: {e}"
+                "❌ Request exception while fetching provider list: %s", e
             )
             return None
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(
-                f"📄 JSON decode error while fetching provider list: {e}"
+                "📄 JSON decode error while fetching provider list: %s", e
             )
             return None
 
     def fetch_availability(
         self, provider_slug: str, target_date: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Synchronous wrapper around fetch_availability_async."""
+        return asyncio.run(
+            self._call_with_session(
+                self.fetch_availability_async, provider_slug, target_date
+            )
+        )
+
+    async def fetch_availability_async(
+        self,
+        session: aiohttp.ClientSession,
+        provider_slug: str,
+        target_date: Optional[str] = None,
     ) -> Optional[Dict]:
         """
         Fetch availability data for a specific provider.
 
         Args:
+            session: Shared aiohttp session
             provider_slug: Unique identifier for the provider
             target_date: Date to check availability for (YYYY-MM-DD format)
 
@@ -259,166 +638,186 @@ class AlmaTherapistScraper:
         if target_date is None:
             target_date = date.today().isoformat()
 
+        miss_key = (provider_slug, target_date)
+        if miss_key in self._availability_misses:
+            logger.debug("🔍 Cached: no availability for %s", provider_slug)
+            return None
+
         url = f"{self.base_url}/api/v1/providers/{provider_slug}/self_schedule_availability/{target_date}/"
 
         logger.debug(
-            f"📅 Fetching availability for: {provider_slug} on {target_date}"
+            "📅 Fetching availability for: %s on %s", provider_slug, target_date
         )
-        logger.debug(f"🔗 Availability URL: {url}")
+        logger.debug("🔗 Availability URL: %s", url)
 
         try:
             start_time = time.time()
-            response = self.session.get(url, timeout=15)
+            response = await self.http_get(session, url, timeout=15)
             response_time = time.time() - start_time
 
-            if response.status_code == 200:
-                data = response.json()
-                available_slots = len(data.get("availableSlots", []))
-                next_dates = len(data.get("nextAvailableDates", {}))
-
-                logger.debug(
-                    f"✅ Availability fetched in {response_time:.2f}s - Slots: {available_slots}, Next dates: {next_dates}"
+            if response.status == 200:
+                data = await response.json(
+                    loads=orjson.loads, content_type=None
                 )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "✅ Availability fetched in %.2fs - Slots: %s, Next dates: %s",
+                        response_time,
+                        len(data.get("availableSlots", [])),
+                        len(data.get("nextAvailableDates", {})),
+                    )
                 return data
-            elif response.status_code == 404:
+            elif response.status == 404:
+                self._availability_misses.add(miss_key)
                 logger.debug(
-                    f"🔍 No availability data found for {provider_slug}"
+                    "🔍 No availability data found for %s", provider_slug
                 )
                 return None
             else:
                 logger.debug(
-                    f"⚠️  Availability request failed: {response.status_code} for {provider_slug}"
+                    "⚠️  Availability request failed: %s for %s",
+                    response.status,
+                    provider_slug,
                 )
                 return None
 
-        except requests.exceptions.Timeout:
-            logger.debug(f"⏰ Availability timeout for {provider_slug}")
+        except asyncio.TimeoutError:
+            logger.debug("⏰ Availability timeout for %s", provider_slug)
             return None
-        except requests.exceptions.RequestException as e:
-            logger.debug(f"❌ Availability error for {provider_slug}: {e}")
+        except aiohttp.ClientError as e:
+            logger.debug("❌ Availability error for %s: %s", provider_slug, e)
             return None
-        except json.JSONDecodeError as e:
-            logger.debug(f"📄 JSON decode error for availability: {e}")
+        except orjson.JSONDecodeError as e:
+            logger.debug("📄 JSON decode error for availability: %s", e)
             return None
 
+    def bucket_filterables(
+        self, filterables: List[Dict]
+    ) -> Dict[str, List[str]]:
+        """
+        Group filterable names by slug prefix in a single pass.
+
+        Args:
+            filterables: List of filterable items
+
+        Returns:
+            Mapping of every prefix in FILTERABLE_PREFIXES and every slug in
+            FILTERABLE_SLUGS to the names of the matching items, in their
+            original order
+        """
+        buckets = {prefix: [] for prefix in FILTERABLE_PREFIXES}
+        buckets.update((slug, []) for slug in FILTERABLE_SLUGS)
+        for item in filterables:
+            slug = item.get("slug", "")
+            if slug in FILTERABLE_SLUGS:
+                buckets[slug].append(item.get("name", ""))
+            for prefix in _PREFIXES_BY_HEAD.get(slug.split("_", 1)[0], ()):
+                if slug.startswith(prefix):
+                    buckets[prefix].append(item.get("name", ""))
+                    break
+        return buckets
+
     def extract_filterables_by_prefix(
-        self, filterables: List[Dict], prefix: str
+        self, buckets: Dict[str, List[str]], prefix: str
     ) -> str:
         """
         Extract and format filterable items by slug prefix.
 
         Args:
-            filterables: List of filterable items
+            buckets: Filterable names grouped by bucket_filterables
             prefix: Prefix to filter by
 
         Returns:
             Comma-separated string of matching items
         """
-        items = []
-        for item in filterables:
-            if item.get("slug", "").startswith(prefix):
-                items.append(item.get("name", ""))
+        items = buckets[prefix]
 
         result = ", ".join(items) if items else ""
-        logger.debug(f"🔍 Filtered '{prefix}': Found {len(items)} items")
+        logger.debug("🔍 Filtered '%s': Found %s items", prefix, len(items))
         return result
 
-    def extract_all_specialties(self, filterables: List[Dict]) -> str:
+    def extract_all_specialties(self, buckets: Dict[str, List[str]]) -> str:
         """
         Extract ALL specialties from filterables for Main Specialties field.
 
         Args:
-            filterables: List of filterable items
+            buckets: Filterable names grouped by bucket_filterables
 
         Returns:
             Comma-separated string of ALL specialties
         """
-        specialties = []
-        for item in filterables:
-            if item.get("slug", "").startswith("specialty_v2_"):
-                specialties.append(item.get("name", ""))
+        specialties = buckets["specialty_v2_"]
 
         all_specialties = ", ".join(specialties) if specialties else ""
-        logger.debug(f"🎯 All specialties extracted: {len(specialties)} items")
+        logger.debug("🎯 All specialties extracted: %s items", len(specialties))
         return all_specialties
 
     def extract_treatment_approaches_detailed(
-        self, filterables: List[Dict]
+        self, buckets: Dict[str, List[str]]
     ) -> str:
         """
         Extract treatment approaches in detailed format like the example.
 
         Args:
-            filterables: List of filterable items
+            buckets: Filterable names grouped by bucket_filterables
 
         Returns:
             Comma-separated string of treatment approaches
         """
-        modalities = []
-        for item in filterables:
-            if item.get("slug", "").startswith("modality_"):
-                modalities.append(item.get("name", ""))
+        modalities = buckets["modality_"]
 
         # Format like the example: "Cognitive Behavioral (CBT), Culturally Sensitive, ..."
         treatment_approaches = ", ".join(modalities) if modalities else ""
-        logger.debug(f"🛠️  Treatment approaches: {len(modalities)} items")
+        logger.debug("🛠️  Treatment approaches: %s items", len(modalities))
         return treatment_approaches
 
     def extract_appointment_types_detailed(
-        self, filterables: List[Dict]
+        self, buckets: Dict[str, List[str]]
     ) -> str:
         """
         Extract appointment types in detailed format.
 
         Args:
-            filterables: List of filterable items
+            buckets: Filterable names grouped by bucket_filterables
 
         Returns:
             Formatted appointment types string
         """
-        services = []
-        for item in filterables:
-            if item.get("slug", "").startswith("service_"):
-                service_name = item.get("name", "")
-                # Format like "Individual therapy" or "Child and adolescent therapy"
-                services.append(service_name)
+        # Service names read like "Individual therapy" or "Child and adolescent therapy"
+        services = buckets["service_"]
 
         # Format like the example: "Video session - 60 minutes"
         # Since we don't have session length, we'll use the services list
         appointment_types = ", ".join(services) if services else "Video session"
-        logger.debug(f"📅 Appointment types: {len(services)} items")
+        logger.debug("📅 Appointment types: %s items", len(services))
         return appointment_types
 
-    def extract_age_groups_detailed(self, filterables: List[Dict]) -> str:
+    def extract_age_groups_detailed(self, buckets: Dict[str, List[str]]) -> str:
         """
         Extract age groups in detailed format.
 
         Args:
-            filterables: List of filterable items
+            buckets: Filterable names grouped by bucket_filterables
 
         Returns:
             Formatted age groups string
         """
-        age_groups = []
-        for item in filterables:
-            if item.get("slug", "").startswith("ages_served_"):
-                age_group = item.get("name", "")
-                age_groups.append(age_group)
+        age_groups = buckets["ages_served_"]
 
         # Format like the example: "Adults, Individual Therapy, Couples Therapy"
         formatted_ages = ", ".join(age_groups) if age_groups else ""
-        logger.debug(f"👥 Age groups: {len(age_groups)} items")
+        logger.debug("👥 Age groups: %s items", len(age_groups))
         return formatted_ages
 
     def extract_highlights(
-        self, provider_data: Dict, filterables: List[Dict]
+        self, provider_data: Dict, buckets: Dict[str, List[str]]
     ) -> str:
         """
         Extract highlights for the provider.
 
         Args:
             provider_data: Provider data
-            filterables: List of filterable items
+            buckets: Filterable names grouped by bucket_filterables
 
         Returns:
             Formatted highlights string
@@ -434,10 +833,7 @@ class AlmaTherapistScraper:
         highlights.append("Verified by Alma")
 
         # Add service types
-        services = []
-        for item in filterables:
-            if item.get("slug", "").startswith("service_"):
-                services.append(item.get("name", ""))
+        services = buckets["service_"]
         if services:
             highlights.append(", ".join(services))
 
@@ -447,7 +843,7 @@ class AlmaTherapistScraper:
             highlights.append("Accepts your insurance")
 
         highlights_str = ", ".join(highlights)
-        logger.debug(f"⭐ Highlights: {len(highlights)} items")
+        logger.debug("⭐ Highlights: %s items", len(highlights))
         return highlights_str
 
     def extract_insurance_names_detailed(
@@ -462,31 +858,42 @@ class AlmaTherapistScraper:
         Returns:
             Comma-separated string of formatted insurance names
         """
+        cache = self._insurance_name_cache
         insurance_names = []
         for slug in insurance_slugs:
-            # Remove 'payment_' prefix and replace underscores with spaces
-            name = slug.replace("payment_", "").replace("_", " ").title()
-            # Clean up common insurance names
-            if "aetna" in name.lower():
-                name = "Aetna"
-            elif "cigna" in name.lower():
-                name = "Cigna"
-            elif "united" in name.lower() and "health" in name.lower():
-                name = "United Healthcare"
-            elif "oxford" in name.lower():
-                name = "Oxford Health Plans"
-            elif "optum" in name.lower():
-                name = "Optum"
+            name = cache.get(slug)
+            if name is None:
+                cache[slug] = name = self.insurance_display_name(slug)
             insurance_names.append(name)
 
         # Remove duplicates and sort
-        unique_insurance = sorted(list(set(insurance_names)))
+        unique_insurance = sorted(set(insurance_names))
         result = ", ".join(unique_insurance)
         logger.debug(
-            f"🏥 Insurance names extracted: {len(unique_insurance)} providers"
+            "🏥 Insurance names extracted: %s providers", len(unique_insurance)
         )
         return result
 
+    @staticmethod
+    def insurance_display_name(slug: str) -> str:
+        """
+        Turn an insurance slug into its display name.
+
+        Args:
+            slug: Insurance slug like "payment_cigna_health"
+
+        Returns:
+            Canonical name for known insurers, otherwise the title-cased slug
+        """
+        # Remove 'payment_' prefix and replace underscores with spaces
+        name = slug.replace("payment_", "").replace("_", " ").title()
+        # Clean up common insurance names
+        lowered = name.lower()
+        for key, canonical in INSURANCE_CANON.items():
+            if key in lowered and (key != "united" or "health" in lowered):
+                return canonical
+        return name
+
     def parse_rate_range(self, rate_value: str) -> tuple:
         """
         Parse min and max session price from rate value string.
@@ -501,21 +908,65 @@ class AlmaTherapistScraper:
             logger.debug("💰 No rate value provided")
             return "", ""
 
+        cached = self._rate_cache.get(rate_value)
+        if cached is not None:
+            return cached
+        self._rate_cache[rate_value] = parsed = self._parse_rate_value(rate_value)
+        return parsed
+
+    def _parse_rate_value(self, rate_value: str) -> tuple:
+        """
+        Parse a non-empty rate value string; see parse_rate_range.
+
+        Args:
+            rate_value: Rate string like "$200-260" or "$140"
+
+        Returns:
+            Tuple of (min_price, max_price) as strings
+        """
         try:
             rate_clean = rate_value.replace("$", "").strip()
             if "-" in rate_clean:
                 min_price, max_price = rate_clean.split("-")
                 min_price = min_price.strip()
                 max_price = max_price.strip()
-                logger.debug(f"💰 Rate range parsed: ${min_price}-${max_price}")
+                logger.debug(
+                    "💰 Rate range parsed: $%s-$%s", min_price, max_price
+                )
                 return min_price, max_price
             else:
-                logger.debug(f"💰 Single rate parsed: ${rate_clean}")
+                logger.debug("💰 Single rate parsed: $%s", rate_clean)
                 return rate_clean, rate_clean
         except Exception as e:
-            logger.warning(f"⚠️  Failed to parse rate value '{rate_value}': {e}")
+            logger.warning(
+                "⚠️  Failed to parse rate value '%s': %s", rate_value, e
+            )
             return "", ""
 
+    def availability_day(self, date_str: str) -> Optional[date]:
+        """
+        Parse an availability key like "2024-05-01" or "2024-05-01T00:00:00Z".
+
+        Args:
+            date_str: Key from nextAvailableDates
+
+        Returns:
+            Calendar date of the key, or None if it is not an ISO date
+        """
+        try:
+            return self._availability_days[date_str]
+        except KeyError:
+            pass
+        try:
+            day = datetime.fromisoformat(date_str.replace("Z", "+00:00")).date()
+        except Exception as e:
+            logger.debug(
+                "⚠️  Error parsing availability date %s: %s", date_str, e
+            )
+            day = None
+        self._availability_days[date_str] = day
+        return day
+
     def calculate_total_slots_7_days(
         self, availability_data: Optional[Dict]
     ) -> int:
@@ -537,39 +988,47 @@ class AlmaTherapistScraper:
         next_dates = availability_data["nextAvailableDates"]
         total_slots = 0
 
-        # Get today's date for comparison
+        # Today + next 6 days = 7 days total
         today = datetime.now().date()
+        window = {today + timedelta(days=offset) for offset in range(7)}
 
         for date_str, slots in next_dates.items():
+            if self.availability_day(date_str) not in window:
+                continue
             try:
-                # Parse the date string
-                date_obj = datetime.fromisoformat(
-                    date_str.replace("Z", "+00:00")
-                ).date()
-
-                # Check if the date is within the next 7 days
-                days_difference = (date_obj - today).days
-                if (
-                    0 <= days_difference <= 6
-                ):  # Today + next 6 days = 7 days total
-                    total_slots += len(slots)
-
+                total_slots += len(slots)
             except Exception as e:
                 logger.debug(
-                    f"⚠️  Error processing date {date_str} for slot count: {e}"
+                    "⚠️  Error processing date %s for slot count: %s",
+                    date_str,
+                    e,
                 )
-                continue
 
-        logger.debug(f"📊 Total slots in 7 days: {total_slots}")
+        logger.debug("📊 Total slots in 7 days: %s", total_slots)
         return total_slots
 
     def generate_npi_data(
         self, name: str, city: str, states: Optional[List[str]] = None
+    ) -> str:
+        """Synchronous wrapper around generate_npi_data_async."""
+        return asyncio.run(
+            self._call_with_session(
+                self.generate_npi_data_async, name, city, states
+            )
+        )
+
+    async def generate_npi_data_async(
+        self,
+        session: aiohttp.ClientSession,
+        name: str,
+        city: str,
+        states: Optional[List[str]] = None,
     ) -> str:
         """
         Generate NPI data using the NPI API for a given provider name, city, and optional states.
 
         Args:
+            session: Shared aiohttp session
             name: Provider's full name
             city: Provider's city
             states: Optional list of state abbreviations to filter results
@@ -578,13 +1037,27 @@ class AlmaTherapistScraper:
             NPI number as string if found, else empty string
         """
         try:
-            first_name = name.split()[0] if len(name.split()) > 0 else ""
-            last_name = name.split()[-1] if len(name.split()) > 1 else ""
-            logger.info(
-                f"🔍 Searching NPI for: first_name='{first_name}', last_name='{last_name}', city='{city}', states={states}"
+            name_parts = name.split()
+            first_name = name_parts[0] if name_parts else ""
+            last_name = name_parts[-1] if len(name_parts) > 1 else ""
+            wanted_states = frozenset(s.upper() for s in states or ())
+
+            # Providers sharing a name and states get the same answer; city
+            # is not part of the query, so it is not part of the key
+            cache_key = (first_name, last_name, wanted_states)
+            if cache_key in self._npi_cache:
+                logger.debug("🗃️  NPI cache hit for %s", name)
+                return self._npi_cache[cache_key]
+
+            logger.debug(
+                "🔍 Searching NPI for: first_name='%s', last_name='%s', city='%s', states=%s",
+                first_name,
+                last_name,
+                city,
+                states,
             )
 
-            url = "https://npiregistry.cms.hhs.gov/api/"
+            url = NPI_API_URL
             params = {
                 "version": "2.1",
                 "first_name": first_name,
@@ -593,12 +1066,12 @@ class AlmaTherapistScraper:
                 "limit": 5,  # fetch multiple to filter by state if needed
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.http_get(session, url, params, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            data = await response.json(loads=orjson.loads, content_type=None)
             results = data.get("results", [])
 
-            logger.info(f"📊 API returned {len(results)} results")
+            logger.debug("📊 API returned %s results", len(results))
 
             if states:
                 results = [
@@ -606,27 +1079,36 @@ class AlmaTherapistScraper:
                     for r in results
                     if r.get("addresses")
                     and any(
-                        addr.get("state", "").upper()
-                        in [s.upper() for s in states]
+                        addr.get("state", "").upper() in wanted_states
                         for addr in r["addresses"]
                     )
                 ]
-                logger.info(
-                    f"📊 Filtered results by states {states}: {len(results)} remaining"
+                logger.debug(
+                    "📊 Filtered results by states %s: %s remaining",
+                    states,
+                    len(results),
                 )
 
+            # Only answers from the registry are cached; failed requests are
+            # retried on the next sighting
+            self._npi_cache_dirty = True
             if results:
                 npi_number = results[0].get("number", "")
-                logger.info(f"✅ Found NPI: {npi_number}")
+                self._npi_cache[cache_key] = npi_number
+                logger.debug("✅ Found NPI: %s", npi_number)
                 return npi_number
 
+            self._npi_cache[cache_key] = ""
             logger.warning(
-                f"⚠️ No NPI found for {name} in city {city} with states={states}"
+                "⚠️ No NPI found for %s in city %s with states=%s",
+                name,
+                city,
+                states,
             )
             return ""
 
         except Exception as e:
-            logger.error(f"❌ Failed to fetch NPI for {name} ({city}): {e}")
+            logger.error("❌ Failed to fetch NPI for %s (%s): %s", name, city, e)
             return ""
 
     def generate_booking_summary(
@@ -654,11 +1136,15 @@ class AlmaTherapistScraper:
         sorted_dates = sorted(next_dates.keys())[:21]
 
         for date_str in sorted_dates:
-            try:
-                date_obj = datetime.fromisoformat(
-                    date_str.replace("Z", "+00:00")
+            if date_str not in self._booking_labels:
+                day = self.availability_day(date_str)
+                self._booking_labels[date_str] = (
+                    day.strftime("%a - %b %d") if day else None
                 )
-                formatted_date = date_obj.strftime("%a - %b %d")
+            formatted_date = self._booking_labels[date_str]
+            if formatted_date is None:
+                continue
+            try:
                 slots = next_dates[date_str]
                 slot_count = len(slots)
                 slot_text = "slot" if slot_count == 1 else "slots"
@@ -666,26 +1152,42 @@ class AlmaTherapistScraper:
                     f"{formatted_date}: {slot_count} {slot_text} (60 min)"
                 )
             except Exception as e:
-                logger.debug(f"⚠️  Error formatting date {date_str}: {e}")
+                logger.debug("⚠️  Error formatting date %s: %s", date_str, e)
                 continue
 
         booking_summary = "; ".join(booking_parts)
         logger.debug(
-            f"📅 Booking summary generated: {len(booking_parts)} dates"
+            "📅 Booking summary generated: %s dates", len(booking_parts)
         )
         return booking_summary
 
+    @staticmethod
+    def provider_full_name(provider_data: Dict) -> str:
+        """Uppercase "first last" name used for the row and the NPI search."""
+        first_name = provider_data.get("providerFirstName", "")
+        last_name = provider_data.get("providerLastName", "")
+        return f"{first_name} {last_name}".strip().upper()
+
     def process_provider_data(
-        self, provider_data: Dict, availability_data: Optional[Dict] = None
+        self,
+        provider_data: Dict,
+        availability_data: Optional[Dict] = None,
+        npi_data: Optional[str] = None,
+        scraped_at: Optional[datetime] = None,
     ) -> Dict:
         """
         Process raw provider data into structured format for Excel export.
         Now formatted to match the exact target structure.
+
+        npi_data is looked up here when the caller has not fetched it already.
+        scraped_at stamps the row; a page of providers can share one.
         """
         provider_id = provider_data.get("providerId", "Unknown")
         provider_slug = provider_data.get("providerSlug", "")
 
-        logger.info(f"🔧 Processing provider: {provider_id} - {provider_slug}")
+        logger.debug(
+            "🔧 Processing provider: %s - %s", provider_id, provider_slug
+        )
 
         # Basic info
         profile_url = (
@@ -695,9 +1197,7 @@ class AlmaTherapistScraper:
         )
 
         # Name - format as uppercase like the example
-        first_name = provider_data.get("providerFirstName", "")
-        last_name = provider_data.get("providerLastName", "")
-        full_name = f"{first_name} {last_name}".strip().upper()
+        full_name = self.provider_full_name(provider_data)
 
         # Profession and bio
         profession = provider_data.get("title", "")
@@ -706,31 +1206,32 @@ class AlmaTherapistScraper:
         # Filterables extraction
         filterables = provider_data.get("filterables", [])
 
+        # One pass over filterables feeds every extract_* helper below
+        buckets = self.bucket_filterables(filterables)
+
         # Enhanced field extraction for the desired format
         treatment_approaches = self.extract_treatment_approaches_detailed(
-            filterables
+            buckets
         )
-        appointment_types = self.extract_appointment_types_detailed(filterables)
-        age_groups = self.extract_age_groups_detailed(filterables)
-        highlights = self.extract_highlights(provider_data, filterables)
-        all_specialties = self.extract_all_specialties(filterables)
+        appointment_types = self.extract_appointment_types_detailed(buckets)
+        age_groups = self.extract_age_groups_detailed(buckets)
+        highlights = self.extract_highlights(provider_data, buckets)
+        all_specialties = self.extract_all_specialties(buckets)
 
         # Languages
-        languages = self.extract_filterables_by_prefix(filterables, "language_")
+        languages = self.extract_filterables_by_prefix(buckets, "language_")
 
         # Gender
-        gender = self.extract_filterables_by_prefix(
-            filterables, "identity_gender_"
-        )
+        gender = self.extract_filterables_by_prefix(buckets, "identity_gender_")
 
         # Race/Ethnicity
         race_ethnicity = self.extract_filterables_by_prefix(
-            filterables, "identity_race_"
+            buckets, "identity_race_"
         )
 
-        # Licenses and states
+        # Licenses and states; the joined list fills both state columns
         licensure_states = provider_data.get("licensureStates", [])
-        licenses = ", ".join(licensure_states) if licensure_states else ""
+        states = ", ".join(licensure_states) if licensure_states else ""
 
         # Rate parsing
         rate_value = provider_data.get("rateValue", "")
@@ -741,30 +1242,29 @@ class AlmaTherapistScraper:
         verified_insurance = provider_data.get(
             "verifiedAcceptedInsuranceSlugs", []
         )
-        all_insurance = list(set(accepted_insurance + verified_insurance))
+        all_insurance = list(
+            dict.fromkeys(accepted_insurance + verified_insurance)
+        )
         insurance_names = self.extract_insurance_names_detailed(all_insurance)
 
         # Pay out of pocket status
-        pay_out_of_pocket = (
-            "Yes"
-            if any(
-                item.get("slug") == "payment_out_of_pocket"
-                for item in filterables
-            )
-            else "No"
-        )
+        pay_out_of_pocket = "Yes" if buckets["payment_out_of_pocket"] else "No"
 
         # Enhanced booking summary
         booking_summary = self.generate_booking_summary(availability_data)
 
         # Generate NPI data - using the existing method
-        npi_data = self.generate_npi_data(full_name, "", licensure_states)
+        if npi_data is None:
+            npi_data = self.generate_npi_data(full_name, "", licensure_states)
 
         # Calculate total slots in 7 days
         total_slots_7_days = self.calculate_total_slots_7_days(
             availability_data
         )
 
+        if scraped_at is None:
+            scraped_at = datetime.now()
+
         # Extract Sr. NO from the nested structure or use providerId as fallback
         sr_no = provider_data.get("Sr", {}).get(" NO", provider_id)
 
@@ -796,10 +1296,8 @@ class AlmaTherapistScraper:
             "General Payment Options": insurance_names,
             "Booking Summary": booking_summary,
             "Booking Url": profile_url,
-            "Listed In States": (
-                ", ".join(licensure_states) if licensure_states else ""
-            ),
-            "States": ", ".join(licensure_states) if licensure_states else "",
+            "Listed In States": states,
+            "States": states,
             "Listed In Websites": "Hello Alma",
             "Urls": profile_url,
             "Connect Link - Facebook": "",
@@ -813,120 +1311,217 @@ class AlmaTherapistScraper:
             "Sr. NO": sr_no,
             # Store raw data and metadata separately
             "raw_data": provider_data,
-            "scraped_at": datetime.now(),
-            "processed_at": datetime.now().isoformat(),
+            "scraped_at": scraped_at,
+            "processed_at": scraped_at.isoformat(),
             "npi_data": npi_data,  # Keep this for reference but it won't be in Excel export
         }
 
-        logger.info(
-            f"✅ Successfully processed: {full_name} (ID: {provider_id}) - {total_slots_7_days} slots in 7 days"
+        logger.debug(
+            "✅ Successfully processed: %s (ID: %s) - %s slots in 7 days",
+            full_name,
+            provider_id,
+            total_slots_7_days,
         )
         return processed_data
 
     def scrape_and_store(self, pages: int = 1, limit: int = 15) -> List[Dict]:
+        """Synchronous wrapper around scrape_and_store_async."""
+        return asyncio.run(self.scrape_and_store_async(pages=pages, limit=limit))
+
+    async def fetch_provider_extras(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        provider: Dict,
+    ) -> tuple:
+        """
+        Fetch availability and NPI data for one provider concurrently.
+
+        Args:
+            session: Shared aiohttp session
+            semaphore: Caps requests in flight across the whole page
+            provider: Raw provider data from the list endpoint
+
+        Returns:
+            Tuple of (availability_data, npi_data)
+        """
+        provider_id = provider.get("providerId", "Unknown")
+        provider_slug = provider.get("providerSlug", "Unknown")
+
+        logger.debug(
+            "👤 Processing provider: %s - %s", provider_id, provider_slug
+        )
+
+        async def availability() -> Optional[Dict]:
+            if provider.get("selfScheduleEnabled") is False:
+                logger.debug(
+                    "📅 Self-scheduling off for %s, skipping availability",
+                    provider_slug,
+                )
+                return None
+            if provider_slug and provider_slug != "Unknown":
+                logger.debug("📅 Fetching availability for %s", provider_slug)
+                async with semaphore:
+                    return await self.fetch_availability_async(
+                        session, provider_slug
+                    )
+            logger.warning(
+                "⚠️  No provider slug for ID %s, skipping availability",
+                provider_id,
+            )
+            return None
+
+        async def npi() -> str:
+            async with semaphore:
+                return await self.generate_npi_data_async(
+                    session,
+                    self.provider_full_name(provider),
+                    "",
+                    provider.get("licensureStates", []),
+                )
+
+        return tuple(await asyncio.gather(availability(), npi()))
+
+    async def scrape_and_store_async(
+        self,
+        pages: int = 1,
+        limit: int = 15,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> List[Dict]:
         """
         Main method to scrape data from multiple pages and store in MongoDB or locally.
 
+        Availability and NPI requests for every provider on a page run
+        concurrently over one keep-alive session; processing and storage
+        stay sequential and in list order.
+
         Args:
             pages: Number of pages to scrape
             limit: Number of results per page
+            session: Session from open_http_session to reuse across calls;
+                a new one is opened and closed when omitted
 
         Returns:
             List of all processed data
         """
+        if session is None:
+            async with self.open_http_session() as session:
+                return await self.scrape_and_store_async(pages, limit, session)
+
         all_processed_data = []
         total_providers_processed = 0
         total_pages_processed = 0
         successful_storages = 0
 
         logger.info(
-            f"🚀 Starting scraping process - Pages: {pages}, Limit: {limit}"
+            "🚀 Starting scraping process - Pages: %s, Limit: %s", pages, limit
         )
         logger.info("=" * 80)
 
-        for page in range(1, pages + 1):
-            logger.info(f"📄 Processing page {page}/{pages}...")
-
-            # Fetch provider list
-            provider_data = self.fetch_provider_list(page=page, limit=limit)
-            if not provider_data:
-                logger.warning(f"⚠️  Skipping page {page} due to fetch failure")
-                continue
-
-            # Process both main results and additional results
-            all_providers = provider_data.get(
-                "results", []
-            ) + provider_data.get("additionalResults", [])
-            logger.info(
-                f"👥 Found {len(all_providers)} providers on page {page}"
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        next_page = None
+        if pages >= 1:
+            next_page = asyncio.create_task(
+                self.fetch_provider_list_async(session, page=1, limit=limit)
             )
-
-            page_processed_count = 0
-            page_successful_storages = 0
-
-            for provider in all_providers:
-                try:
-                    provider_id = provider.get("providerId", "Unknown")
-                    provider_slug = provider.get("providerSlug", "Unknown")
-
-                    logger.info(
-                        f"👤 Processing provider: {provider_id} - {provider_slug}"
+        try:
+            for page in range(1, pages + 1):
+                logger.info("📄 Processing page %s/%s...", page, pages)
+
+                # Fetch provider list; the next page downloads while this one is
+                # processed
+                provider_data = await next_page
+                if page < pages:
+                    next_page = asyncio.create_task(
+                        self.fetch_provider_list_async(
+                            session, page=page + 1, limit=limit
+                        )
                     )
+                if not provider_data:
+                    logger.warning(
+                        "⚠️  Skipping page %s due to fetch failure", page
+                    )
+                    continue
 
-                    # Fetch availability data
-                    availability_data = None
-                    if provider_slug and provider_slug != "Unknown":
-                        logger.debug(
-                            f"📅 Fetching availability for {provider_slug}"
-                        )
-                        availability_data = self.fetch_availability(
-                            provider_slug
-                        )
-                        time.sleep(0.5)  # Be respectful to the server
-                    else:
-                        logger.warning(
-                            f"⚠️  No provider slug for ID {provider_id}, skipping availability"
-                        )
+                # Process both main results and additional results
+                all_providers = provider_data.get(
+                    "results", []
+                ) + provider_data.get("additionalResults", [])
+                logger.info(
+                    "👥 Found %s providers on page %s", len(all_providers), page
+                )
 
-                    # Process the data
-                    processed_data = self.process_provider_data(
-                        provider, availability_data
-                    )
+                page_processed_count = 0
+                page_successful_storages = 0
 
-                    # Store the data
-                    storage_success = self.store_data(processed_data)
+                # Fetch availability and NPI data for the whole page at once
+                extras = await asyncio.gather(
+                    *(
+                        self.fetch_provider_extras(session, semaphore, provider)
+                        for provider in all_providers
+                    ),
+                    return_exceptions=True,
+                )
 
-                    if storage_success:
-                        page_successful_storages += 1
-                        successful_storages += 1
-                        logger.info(
-                            f"💾 Storage successful: {processed_data['Name']}"
-                        )
-                    else:
-                        logger.warning(
-                            f"⚠️  Storage failed but data processed: {processed_data['Name']}"
+                # One timestamp for every provider processed from this page
+                page_scraped_at = datetime.now()
+                for provider, extra in zip(all_providers, extras):
+                    try:
+                        if isinstance(extra, Exception):
+                            raise extra
+                        availability_data, npi_data = extra
+
+                        # Process the data
+                        processed_data = self.process_provider_data(
+                            provider,
+                            availability_data,
+                            npi_data,
+                            page_scraped_at,
                         )
 
-                    all_processed_data.append(processed_data)
-                    page_processed_count += 1
-                    total_providers_processed += 1
-
-                except Exception as e:
-                    logger.error(
-                        f"❌ Error processing provider {provider.get('providerSlug', 'unknown')}: {e}"
-                    )
-                    continue
+                        # Store the data
+                        storage_success = self.store_data(processed_data)
+
+                        if storage_success:
+                            page_successful_storages += 1
+                            successful_storages += 1
+                            logger.debug(
+                                "💾 Storage successful: %s",
+                                processed_data['Name'],
+                            )
+                        else:
+                            logger.warning(
+                                "⚠️  Storage failed but data processed: %s",
+                                processed_data['Name'],
+                            )
+
+                        all_processed_data.append(processed_data)
+                        page_processed_count += 1
+                        total_providers_processed += 1
+
+                    except Exception as e:
+                        logger.error(
+                            "❌ Error processing provider %s: %s",
+                            provider.get('providerSlug', 'unknown'),
+                            e,
+                        )
+                        continue
 
-            total_pages_processed += 1
-            logger.info(
-                f"📊 Page {page} completed: {page_processed_count}/{len(all_providers)} providers processed, {page_successful_storages} stored successfully"
-            )
+                total_pages_processed += 1
+                logger.info(
+                    "📊 Page %s completed: %s/%s providers processed, %s stored successfully",
+                    page,
+                    page_processed_count,
+                    len(all_providers),
+                    page_successful_storages,
+                )
+        finally:
+            # A prefetch left pending by an error would otherwise be dropped
+            if next_page is not None:
+                next_page.cancel()
 
-            # Add delay between pages to be respectful
-            if page < pages:
-                delay = 2
-                logger.info(f"⏳ Waiting {delay} seconds before next page...")
-                time.sleep(delay)
+        if self.use_mongodb:
+            self.flush()
 
         logger.info("=" * 80)
         logger.info(f"🎉 Scraping completed successfully!")
@@ -1032,16 +1627,11 @@ class AlmaTherapistScraper:
                 "Sr. NO",
             ]
 
-            # Add missing columns with empty values
-            for col in expected_columns:
-                if col not in df.columns:
-                    df[col] = ""
-
-            # Reorder columns to match exact specification
-            df = df[expected_columns]
+            # Add missing columns and fix the order in one step
+            df = df.reindex(columns=expected_columns, fill_value="")
 
             # Export to Excel
-            df.to_excel(filename, index=False, engine="openpyxl")
+            _write_xlsx(df, filename)
             logger.info(f"✅ Excel file created successfully: {filename}")
 
             # Print summary
@@ -1049,10 +1639,8 @@ class AlmaTherapistScraper:
             logger.info(f"   • Total therapists: {len(df)}")
             logger.info(f"   • Total columns: {len(df.columns)}")
 
-            # Show column alignment
-            logger.info("🔍 Column alignment check:")
-            for i, col in enumerate(expected_columns, 1):
-                logger.info(f"   {i:2d}. {col}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 Column order: %s", expected_columns)
 
             return df
 
@@ -1073,25 +1661,19 @@ class AlmaTherapistScraper:
                 latest_scrape = self.collection.find_one(
                     sort=[("scraped_at", -1)]
                 )
+                last_scraped = (
+                    latest_scrape.get("scraped_at") if latest_scrape else None
+                )
                 storage_type = "MongoDB"
             else:
-                total_documents = len(self.local_data)
-                latest_scrape = (
-                    max(
-                        self.local_data,
-                        key=lambda x: x.get("scraped_at", datetime.min),
-                    )
-                    if self.local_data
-                    else None
-                )
+                total_documents = len(self._local_records)
+                last_scraped = self._latest_local_scrape
                 storage_type = "Local Storage"
 
             stats = {
                 "storage_type": storage_type,
                 "total_therapists": total_documents,
-                "last_scraped": (
-                    latest_scrape.get("scraped_at") if latest_scrape else None
-                ),
+                "last_scraped": last_scraped,
             }
 
             logger.info("📈 Scraping Statistics:")
@@ -1110,8 +1692,12 @@ class AlmaTherapistScraper:
         logger.info("🔚 Closing Alma Therapist Scraper...")
         try:
             if self.use_mongodb:
+                self.flush()
                 self.client.close()
-            self.session.close()
+            elif self._backup_fp is not None:
+                # Compact the appended records into one copy per provider
+                self.save_local_backup()
+            self.save_npi_cache()
             logger.info("✅ Resources cleaned up successfully")
         except Exception as e:
             logger.error(f"❌ Error during cleanup: {e}")
@@ -1151,8 +1737,15 @@ def main():
         logger.info(f"   • Output: Structured therapist data")
 
         logger.info("🌐 Beginning data scraping process...")
-        for i in range(40001):
-            scraper.scrape_and_store(pages=i + 1, limit=15)
+        async def scrape_all():
+            # One session for every round keeps connections warm between them
+            async with scraper.open_http_session() as session:
+                for i in range(40001):
+                    await scraper.scrape_and_store_async(
+                        pages=i + 1, limit=15, session=session
+                    )
+
+        asyncio.run(scrape_all())
 
         logger.info("📊 Generating scraping statistics...")
         scraper.get_scraping_statistics()
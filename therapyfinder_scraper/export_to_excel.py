@@ -1,9 +1,17 @@
+import json
 import logging
 import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
 from typing import Any, Dict, List, Optional
 
-import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+from openpyxl import Workbook
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
 
@@ -21,6 +29,53 @@ MONGO_USER = os.getenv("MONGO_USER", "scraper")
 MONGO_PASSWORD = os.getenv("MONGO_PASSWORD", "scraper")
 
 OUTPUT_DIR = "/app/exports/therapyfinder/"
+# Latest snapshot per site, shared with the headway exporter; collection.xlsx
+# is only rebuilt from these on demand (headway's --rebuild-collection)
+COLLECTION_DIR = "/app/exports/collection/"
+ANALYSIS_FILE = "/app/exports/analysis.xlsx"
+COUNTS_FILE = os.path.join(COLLECTION_DIR, "counts.json")
+PROFILE_URL_PREFIX = "https://therapyfinder.com/therapist/"
+# Worker processes for flattening; 1 keeps everything in-process
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(os.cpu_count() or 1)))
+# Clinicians handed to a worker per IPC round-trip
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Only the fields flatten_clinician_data reads; the full API attributes
+# payload stored with each clinician stays on the server
+PROJECTION = {
+    "_id": 0,
+    "clinician_id": 1,
+    "display_name": 1,
+    "bio": 1,
+    "links": 1,
+    "location_city": 1,
+    "location_state": 1,
+    **{
+        f"attributes.{field}": 1
+        for field in [
+            "slug",
+            "npiNumber",
+            "title",
+            "fees",
+            "allSpecialties",
+            "allServices",
+            "treatmentTypes",
+            "communities",
+            "ageGroups",
+            "languages",
+            "gender",
+            "pronouns",
+            "raceEthnicities",
+            "allInsuranceCarriers",
+            "faiths",
+            "profileImgUrl",
+            "facebookUrl",
+            "instagramUrl",
+            "linkedinUrl",
+            "twitterUrl",
+        ]
+    },
+}
 
 
 # Analysis counters
@@ -39,6 +94,16 @@ class AnalysisCounters:
             self.fields_with_empty_data.get(field_name, 0) + 1
         )
 
+    def merge(self, other: "AnalysisCounters"):
+        """Add the flatten counts gathered by another instance"""
+        self.successful_flattens += other.successful_flattens
+        self.failed_flattens += other.failed_flattens
+        self.records_with_missing_data += other.records_with_missing_data
+        for field_name, count in other.fields_with_empty_data.items():
+            self.fields_with_empty_data[field_name] = (
+                self.fields_with_empty_data.get(field_name, 0) + count
+            )
+
     def print_summary(self):
         logger.info("=== DATA ANALYSIS SUMMARY ===")
         logger.info(f"Total clinicians in database: {self.total_clinicians}")
@@ -89,90 +154,44 @@ def get_mongo_client() -> MongoClient:
         raise
 
 
-def safe_get_list(data: Dict, key: str, default: List = None) -> List:
-    """
-    Safely extract list from dictionary with comprehensive type checking
-    """
-    if default is None:
-        default = []
-
-    try:
-        value = data.get(key)
-        if value is None:
-            return default
-        elif isinstance(value, list):
-            return value
-        elif isinstance(value, str):
-            # Try to handle string representations of lists
-            return [value]
-        else:
-            logger.warning(
-                f"Unexpected type for key '{key}': {type(value)}. Returning default."
-            )
-            return default
-    except Exception as e:
-        logger.warning(f"Error extracting list for key '{key}': {e}")
-        return default
-
-
-def safe_join_strings(
-    data_list: List, separator: str = ", ", field_name: str = "unknown"
-) -> str:
-    """
-    Safely join strings from a list of dictionaries with enhanced error handling
-    """
-    if not data_list:
-        return ""
-
-    try:
-        joined_string = separator.join(
-            [
-                str(item.get("name", ""))
-                for item in data_list
-                if item and isinstance(item, dict) and item.get("name")
-            ]
-        )
-        return joined_string
-    except Exception as e:
-        logger.warning(f"Error joining strings for field '{field_name}': {e}")
-        return ""
-
-
-def analyze_data_quality(clinician: Dict, counters: AnalysisCounters) -> None:
-    """
-    Analyze data quality and update counters
-    """
-    attributes = clinician.get("attributes", {})
-
-    # Check for missing critical fields
-    critical_fields = ["display_name", "links"]
-    missing_critical = any(
-        not clinician.get(field) for field in critical_fields
-    )
-    if missing_critical:
-        counters.records_with_missing_data += 1
-
-    # Analyze empty fields in the flattened structure (predicted)
-    test_flattened = flatten_clinician_data(
-        clinician, counters, analyze_only=True
-    )
-
-    for field, value in test_flattened.items():
-        if not value and value != 0:  # 0 might be valid for some numeric fields
-            counters.increment_field_empty(field)
+# Output columns filled by joining the "name" of each item in a list
+# attribute; several columns repeat the same source attribute
+_JOIN_FIELDS = (
+    ("Additional Focus Areas", "allSpecialties"),
+    ("Treatment Approaches", "allServices"),
+    ("Appointment Types", "treatmentTypes"),
+    ("Communities", "communities"),
+    ("Age Groups", "ageGroups"),
+    ("Languages", "languages"),
+    ("Gender", "gender"),
+    ("Pronouns", "pronouns"),
+    ("Race Ethnicity", "raceEthnicities"),
+    ("Licenses", "allInsuranceCarriers"),
+    ("Faiths", "faiths"),
+    ("Individual Service Rates", "allServices"),
+    ("Main Specialties", "allSpecialties"),
+    ("Accepted IPs", "allInsuranceCarriers"),
+)
 
 
 def flatten_clinician_data(
-    clinician: Dict, counters: AnalysisCounters, analyze_only: bool = False
+    clinician: Dict, counters: AnalysisCounters
 ) -> Dict[str, Any]:
     """
     Flatten clinician data with comprehensive error handling and data analysis
 
+    Data quality counters (missing critical fields, empty output fields) are
+    updated in the same pass.
+
     Args:
         clinician: Raw clinician data from MongoDB
         counters: Analysis counters instance
-        analyze_only: If True, only analyze don't count as successful processing
     """
+    # Check for missing critical fields
+    critical_fields = ["display_name", "links"]
+    if any(not clinician.get(field) for field in critical_fields):
+        counters.records_with_missing_data += 1
+
     try:
         attributes = clinician.get("attributes", {})
 
@@ -184,69 +203,57 @@ def flatten_clinician_data(
             min_fee = fees[0].get("min_fee", "")
             max_fee = fees[0].get("max_fee", "")
 
+        # Anything other than a list of dicts joins to ""
+        joined = {}
+        for column, source in _JOIN_FIELDS:
+            items = attributes.get(source)
+            if not isinstance(items, list):
+                joined[column] = ""
+                continue
+            names = [
+                item["name"]
+                for item in items
+                if isinstance(item, dict) and item.get("name")
+            ]
+            try:
+                joined[column] = ", ".join(names)
+            except TypeError:
+                # Names are strings in practice; convert only when one is not
+                joined[column] = ", ".join(map(str, names))
+
         flattened = {
             "clinician_id": clinician.get("clinician_id", ""),
-            "Url": f"https://therapyfinder.com/therapist/{attributes.get('slug', '')}",
+            "Url": PROFILE_URL_PREFIX + (attributes.get("slug") or ""),
             "Name": clinician.get("display_name", ""),
             "NPI": attributes.get("npiNumber", ""),
             "Profession": attributes.get("title", ""),
             "Clinic Name": "",
             "Bio": clinician.get("bio", ""),
-            "Additional Focus Areas": safe_join_strings(
-                safe_get_list(attributes, "allSpecialties"),
-                field_name="Additional Focus Areas",
-            ),
-            "Treatment Approaches": safe_join_strings(
-                safe_get_list(attributes, "allServices"),
-                field_name="Treatment Approaches",
-            ),
-            "Appointment Types": safe_join_strings(
-                safe_get_list(attributes, "treatmentTypes"),
-                field_name="Appointment Types",
-            ),
-            "Communities": safe_join_strings(
-                safe_get_list(attributes, "communities"),
-                field_name="Communities",
-            ),
-            "Age Groups": safe_join_strings(
-                safe_get_list(attributes, "ageGroups"), field_name="Age Groups"
-            ),
-            "Languages": safe_join_strings(
-                safe_get_list(attributes, "languages"), field_name="Languages"
-            ),
+            "Additional Focus Areas": joined["Additional Focus Areas"],
+            "Treatment Approaches": joined["Treatment Approaches"],
+            "Appointment Types": joined["Appointment Types"],
+            "Communities": joined["Communities"],
+            "Age Groups": joined["Age Groups"],
+            "Languages": joined["Languages"],
             "Highlights": "",
-            "Gender": safe_join_strings(
-                safe_get_list(attributes, "gender"), field_name="Gender"
-            ),
-            "Pronouns": safe_join_strings(
-                safe_get_list(attributes, "pronouns"), field_name="Pronouns"
-            ),
-            "Race Ethnicity": safe_join_strings(
-                safe_get_list(attributes, "raceEthnicities"),
-                field_name="Race Ethnicity",
-            ),
-            "Licenses": safe_join_strings(
-                safe_get_list(
-                    attributes, "allInsuranceCarriers"
-                ),  # Note: This might be misnamed
-                field_name="Licenses",
-            ),
-            "Locations": f"{clinician.get('location_city', '')}, {clinician.get('location_state', '')}".strip(
-                ", "
+            "Gender": joined["Gender"],
+            "Pronouns": joined["Pronouns"],
+            "Race Ethnicity": joined["Race Ethnicity"],
+            "Licenses": joined["Licenses"],
+            "Locations": ", ".join(
+                part
+                for part in (
+                    clinician.get("location_city"),
+                    clinician.get("location_state"),
+                )
+                if part
             ),
             "Education": "",
-            "Faiths": safe_join_strings(
-                safe_get_list(attributes, "faiths"), field_name="Faiths"
-            ),
+            "Faiths": joined["Faiths"],
             "Min Session Price": min_fee,
             "Max Session Price": max_fee,
             "Pay Out Of Pocket Status": "",
-            "Individual Service Rates": safe_join_strings(
-                safe_get_list(
-                    attributes, "allServices"
-                ),  # Duplicate of Treatment Approaches?
-                field_name="Individual Service Rates",
-            ),
+            "Individual Service Rates": joined["Individual Service Rates"],
             "General Payment Options": "",
             "Booking Summary": "",
             "Booking Url": "",
@@ -259,36 +266,28 @@ def flatten_clinician_data(
             "Connect Link - LinkedIn": attributes.get("linkedinUrl", ""),
             "Connect Link - Twitter": attributes.get("twitterUrl", ""),
             "Connect Link - Website": "",
-            "Main Specialties": safe_join_strings(
-                safe_get_list(
-                    attributes, "allSpecialties"
-                ),  # Duplicate of Additional Focus Areas?
-                field_name="Main Specialties",
-            ),
-            "Accepted IPs": safe_join_strings(
-                safe_get_list(attributes, "allInsuranceCarriers"),
-                field_name="Accepted IPs",
-            ),
+            "Main Specialties": joined["Main Specialties"],
+            "Accepted IPs": joined["Accepted IPs"],
             "Sr. NO": "",
         }
 
-        # Clean None values
-        for key in flattened:
-            if flattened[key] is None:
-                flattened[key] = ""
+        # Clean None values and count empty fields
+        for key, value in flattened.items():
+            if value is None:
+                flattened[key] = value = ""
+            if not value and value != 0:  # 0 might be valid for some numeric fields
+                counters.increment_field_empty(key)
 
-        if not analyze_only:
-            counters.successful_flattens += 1
+        counters.successful_flattens += 1
 
         return flattened
 
     except Exception as e:
-        if not analyze_only:
-            counters.failed_flattens += 1
-            logger.error(f"Error flattening clinician data: {e}")
-            logger.debug(
-                f"Problematic clinician: {clinician.get('display_name', 'Unknown')}"
-            )
+        counters.failed_flattens += 1
+        logger.error("Error flattening clinician data: %s", e)
+        logger.debug(
+            "Problematic clinician: %s", clinician.get("display_name", "Unknown")
+        )
 
         # Return minimal structure even on failure
         return {
@@ -297,6 +296,100 @@ def flatten_clinician_data(
         }
 
 
+def flatten_batch(clinicians: List[Dict]):
+    """
+    Flatten a batch of clinicians, typically in a worker process
+
+    Returns the flattened rows and the counters gathered while flattening
+    them, for the caller to merge into its own.
+    """
+    counters = AnalysisCounters()
+    rows = [flatten_clinician_data(c, counters) for c in clinicians]
+    return rows, counters
+
+
+def flatten_cursor(cursor):
+    """
+    Yield (rows, counters) for each batch of clinicians read from cursor
+
+    Batches are flattened across EXPORT_WORKERS processes and yielded in
+    cursor order. Only a couple of batches per worker are in flight, so the
+    cursor is not drained into memory ahead of the writer.
+    """
+    batches = iter(lambda: list(islice(cursor, EXPORT_BATCH_SIZE)), [])
+    if EXPORT_WORKERS <= 1:
+        yield from map(flatten_batch, batches)
+        return
+
+    with ProcessPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(flatten_batch, batch))
+            if len(pending) >= EXPORT_WORKERS * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def to_cell_text(value: Any) -> str:
+    """Render a flattened value as Parquet text (None becomes blank)"""
+    return "" if value is None else str(value)
+
+
+def write_parquet_batch(writer: pq.ParquetWriter, rows: List[tuple]) -> None:
+    """Append buffered row tuples to the Parquet file as one row group"""
+    columns = [pa.array(col, type=pa.string()) for col in zip(*rows)]
+    writer.write_table(pa.Table.from_arrays(columns, schema=writer.schema))
+
+
+def publish_snapshot(source_file: str, target_file: str) -> None:
+    """Copy a file into place atomically so readers never see a partial file"""
+    tmp_target = f"{target_file}.tmp"
+    shutil.copyfile(source_file, tmp_target)
+    os.replace(tmp_target, target_file)
+
+
+def update_collection_index(
+    parquet_file: str, website_name: str, record_count: int
+) -> None:
+    """
+    Publish a run as the site's snapshot and refresh analysis.xlsx
+
+    Same layout as the headway exporter, which shares these files: only
+    this site's snapshot and its entry in counts.json are touched, so the
+    cost does not grow with the number of sites in the collection.
+    """
+    os.makedirs(COLLECTION_DIR, exist_ok=True)
+    target = os.path.join(COLLECTION_DIR, f"{website_name}.parquet")
+    publish_snapshot(parquet_file, target)
+
+    # Per-site row counts live in a tiny registry; no snapshot is re-read
+    try:
+        with open(COUNTS_FILE, encoding="utf-8") as f:
+            counts = json.load(f)
+    except (OSError, ValueError):
+        counts = {}
+    counts[website_name] = record_count
+
+    tmp_counts = f"{COUNTS_FILE}.tmp"
+    with open(tmp_counts, "w", encoding="utf-8") as f:
+        json.dump(counts, f, indent=2, sort_keys=True)
+    os.replace(tmp_counts, COUNTS_FILE)
+
+    wb = Workbook(write_only=True)
+    analysis_ws = wb.create_sheet(title="analysis")
+    analysis_ws.append([f"Total {site}" for site in sorted(counts)])
+    analysis_ws.append([counts[site] for site in sorted(counts)])
+    tmp_analysis = ANALYSIS_FILE.replace(".xlsx", ".tmp.xlsx")
+    wb.save(tmp_analysis)
+    os.replace(tmp_analysis, ANALYSIS_FILE)
+
+    logger.info(
+        f"Updated collection snapshot {target} | "
+        f"{record_count} {website_name} records"
+    )
+
+
 def export_clinicians_to_excel():
     """
     Export clinicians to Excel with detailed logging and memory efficiency.
@@ -304,8 +397,6 @@ def export_clinicians_to_excel():
     import os
     from datetime import datetime
 
-    import pandas as pd
-    from openpyxl import Workbook, load_workbook
     from pymongo.errors import ConnectionFailure, OperationFailure
 
     counters = AnalysisCounters()
@@ -316,8 +407,9 @@ def export_clinicians_to_excel():
         db = client[MONGO_DB]
         logger.info(f"Connected to database: {MONGO_DB}")
 
-        cursor = db.clinicians.find(batch_size=500)
-        total_clinicians = db.clinicians.count_documents({})
+        cursor = db.clinicians.find({}, PROJECTION, batch_size=1000)
+        # Collection metadata; an exact count would scan every document
+        total_clinicians = db.clinicians.estimated_document_count()
         counters.total_clinicians = total_clinicians
         logger.info(f"Total clinicians in database: {total_clinicians}")
 
@@ -325,42 +417,65 @@ def export_clinicians_to_excel():
         output_file = os.path.join(
             OUTPUT_DIR, f"therapyfinder_clinicians_{timestamp}.xlsx"
         )
+        parquet_file = os.path.join(
+            OUTPUT_DIR, f"therapyfinder_clinicians_{timestamp}.parquet"
+        )
         os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-        wb = Workbook(write_only=True)
-        ws = wb.create_sheet(title="therapyfinder")
+        # constant_memory streams each row's XML to disk as it is written;
+        # URL-looking strings stay plain text as they did with openpyxl
+        wb = xlsxwriter.Workbook(
+            output_file, {"constant_memory": True, "strings_to_urls": False}
+        )
+        ws = wb.add_worksheet("therapyfinder")
+        # The collection snapshot gets the same rows as Parquet in the same
+        # pass, so the clinicians are read from MongoDB only once
+        parquet_writer = None
         headers_written = False
-        row_number = 1
-
-        for i, clinician in enumerate(cursor, 1):
-            if i % 500 == 0:
-                logger.info(f"Processed {i} clinicians...")
-
-            try:
-                analyze_data_quality(clinician, counters)
-                flat = flatten_clinician_data(
-                    clinician, counters, analyze_only=False
-                )
-                flat["Sr. NO"] = i
-
-                if not headers_written:
-                    ws.append(list(flat.keys()))
-                    headers_written = True
-
-                ws.append(list(flat.values()))
-            except Exception as e:
-                failed_records.append(
-                    {
-                        "index": i,
-                        "name": clinician.get("display_name", "Unknown"),
-                        "error": str(e),
-                    }
-                )
-                counters.failed_flattens += 1
-                logger.warning(f"Failed processing clinician {i}: {e}")
-                continue
-
-        wb.save(output_file)
+        i = 0
+
+        for rows, batch_counters in flatten_cursor(cursor):
+            counters.merge(batch_counters)
+            parquet_rows = []
+            for flat in rows:
+                i += 1
+                if i % 500 == 0:
+                    logger.info("Processed %d clinicians...", i)
+
+                try:
+                    flat["Sr. NO"] = i
+
+                    if not headers_written:
+                        headers = tuple(flat)
+                        ws.write_row(0, 0, headers)
+                        parquet_writer = pq.ParquetWriter(
+                            parquet_file,
+                            pa.schema([(h, pa.string()) for h in headers]),
+                            compression="zstd",
+                        )
+                        headers_written = True
+
+                    # Rows are only read by the writers; a tuple will do
+                    values = tuple(flat.values())
+                    ws.write_row(i, 0, values)
+                    parquet_rows.append(tuple(map(to_cell_text, values)))
+                except Exception as e:
+                    failed_records.append(
+                        {
+                            "index": i,
+                            "name": flat.get("Name", "Unknown"),
+                            "error": str(e),
+                        }
+                    )
+                    counters.failed_flattens += 1
+                    logger.warning("Failed processing clinician %d: %s", i, e)
+                    continue
+            if parquet_rows:
+                write_parquet_batch(parquet_writer, parquet_rows)
+
+        wb.close()
+        if parquet_writer is not None:
+            parquet_writer.close()
         counters.records_exported = i - counters.failed_flattens
         logger.info(f"Excel exported successfully: {output_file}")
 
@@ -377,28 +492,11 @@ def export_clinicians_to_excel():
                     f"...and {len(failed_records) - 5} more failed records."
                 )
 
-        # Export to collection.xlsx safely
-        collection_file = "/app/exports/collection.xlsx"
-        website_name = "therapyfinder"
-
-        if os.path.exists(collection_file):
-            book = load_workbook(collection_file)
-            if website_name in book.sheetnames:
-                std = book[website_name]
-                book.remove(std)
-            with pd.ExcelWriter(
-                collection_file, engine="openpyxl", mode="a"
-            ) as writer:
-                df = pd.DataFrame(list(db.clinicians.find()))
-                df.to_excel(writer, sheet_name=website_name, index=False)
-                analysis_df = pd.DataFrame({f"Total {website_name}": [len(df)]})
-                analysis_df.to_excel(writer, sheet_name="analysis", index=False)
+        # Publish this run as the site's collection snapshot
+        if parquet_writer is not None:
+            update_collection_index(parquet_file, "therapyfinder", i)
         else:
-            with pd.ExcelWriter(collection_file, engine="openpyxl") as writer:
-                df = pd.DataFrame(list(db.clinicians.find()))
-                df.to_excel(writer, sheet_name=website_name, index=False)
-                analysis_df = pd.DataFrame({f"Total {website_name}": [len(df)]})
-                analysis_df.to_excel(writer, sheet_name="analysis", index=False)
+            logger.warning("No clinicians exported; snapshot left unchanged")
 
     except ConnectionFailure as e:
         logger.error(f"Database connection failed: {e}")
@@ -1,13 +1,19 @@
 import asyncio
 import os
+import random
+import signal
 import sys
-import time
+import zlib
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Optional
 
 import aiohttp
-import requests
-from pymongo import MongoClient, UpdateOne
+import orjson
+from bson.binary import Binary
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 # Environment variables
 MONGO_HOST = os.getenv("MONGO_HOST", "mongodb")
@@ -15,40 +21,129 @@ MONGO_PORT = int(os.getenv("MONGO_PORT", "27017"))
 MONGO_DB = os.getenv("MONGO_DB", "therapyfinder_speed_test")
 MONGO_USER = os.getenv("MONGO_USER", "scraper")
 MONGO_PASSWORD = os.getenv("MONGO_PASSWORD", "scraper")
+MONGO_URI = f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/{MONGO_DB}?authSource=admin"
 API_URL = os.getenv("API_URL", "https://therapyfinder.com/api/clinicians")
 SCRAPE_LIMIT = int(os.getenv("SCRAPE_LIMIT", "0"))
 MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "10"))
+# Starting batch size; it is then tuned toward TARGET_WRITE_SECONDS
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))
+MIN_BATCH_SIZE = int(os.getenv("MIN_BATCH_SIZE", "25"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+# Bounds for the adaptive request rate, in requests per second
+MIN_REQUESTS_PER_SECOND = float(os.getenv("MIN_REQUESTS_PER_SECOND", "1"))
+MAX_REQUESTS_PER_SECOND = float(os.getenv("MAX_REQUESTS_PER_SECOND", "20"))
+# Retries for throttled or failing clinician page requests
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+MAX_BACKOFF_SECONDS = 60
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Clinician ids remembered as already stored, newest last
+SEEN_CLINICIANS_LIMIT = int(os.getenv("SEEN_CLINICIANS_LIMIT", "200000"))
+DUPLICATE_KEY_ERROR = 11000
 
 
 class RateLimiter:
-    """Rate limiter to control request frequency"""
-
-    def __init__(self, max_calls: int, period: float):
+    """Adaptive rate limiter to control request frequency
+
+    Each caller reserves the next free slot and sleeps until it arrives.
+    Slots are spaced 1 / rate apart, and up to max_calls of them may start
+    at once after an idle spell. No lock is needed: the event loop only
+    switches tasks at an await, and the reservation has none.
+
+    The rate starts at max_calls / period and then follows the server:
+    it creeps up after each success and is cut after a throttled or
+    failed response, within [min_rate, max_rate].
+    """
+
+    def __init__(
+        self,
+        max_calls: int,
+        period: float,
+        min_rate: float = 1.0,
+        max_rate: float = 20.0,
+        increase_factor: float = 1.02,
+        decrease_factor: float = 0.5,
+    ):
         self.max_calls = max_calls
         self.period = period
-        self.calls = []
-        self.lock = asyncio.Lock()
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_factor = increase_factor
+        self.decrease_factor = decrease_factor
+        self.next_slot = 0.0
+        self.last_decrease = float("-inf")
+        self.set_rate(max_calls / period)
+
+    def set_rate(self, rate: float):
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        self.interval = 1 / self.rate
+        # How far ahead of the clock reservations may run (the burst)
+        self.tolerance = (self.max_calls - 1) * self.interval
+
+    def increase_rate(self):
+        self.set_rate(self.rate * self.increase_factor)
+
+    def decrease_rate(self):
+        # Responses already in flight report the same congestion; cut once
+        now = asyncio.get_running_loop().time()
+        if now - self.last_decrease < self.interval * self.max_calls:
+            return
+        self.last_decrease = now
+        self.set_rate(self.rate * self.decrease_factor)
+        print(f"🐢 Request rate lowered to {self.rate:.1f}/s")
 
     async def acquire(self):
-        async with self.lock:
-            now = time.time()
-            # Remove calls outside the current period
-            self.calls = [
-                call for call in self.calls if now - call < self.period
-            ]
-
-            if len(self.calls) >= self.max_calls:
-                sleep_time = self.period - (now - self.calls[0])
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
-                self.calls = self.calls[1:]
-
-            self.calls.append(time.time())
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self.next_slot - self.tolerance)
+        self.next_slot = max(self.next_slot, now) + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BatchSizer:
+    """Tunes a write batch size from observed MongoDB write latency
+
+    An exponentially weighted average of the write time is kept. Below
+    fast_seconds the batch doubles, since round-trips dominate; above
+    slow_seconds it halves, to keep memory and write stalls bounded.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        min_size: int,
+        max_size: int,
+        fast_seconds: float = 0.05,
+        slow_seconds: float = 0.2,
+        smoothing: float = 0.3,
+    ):
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.fast_seconds = fast_seconds
+        self.slow_seconds = slow_seconds
+        self.smoothing = smoothing
+        self.average_seconds = None
+
+    def record(self, seconds: float):
+        if self.average_seconds is None:
+            self.average_seconds = seconds
+        else:
+            self.average_seconds += self.smoothing * (
+                seconds - self.average_seconds
+            )
+        if self.average_seconds < self.fast_seconds:
+            self.size = min(self.max_size, self.size * 2)
+        elif self.average_seconds > self.slow_seconds:
+            self.size = max(self.min_size, self.size // 2)
 
 
-# Global rate limiter (10 requests per second)
-rate_limiter = RateLimiter(max_calls=10, period=1.0)
+# Global rate limiter (starts at 10 requests per second)
+rate_limiter = RateLimiter(
+    max_calls=10,
+    period=1.0,
+    min_rate=MIN_REQUESTS_PER_SECOND,
+    max_rate=MAX_REQUESTS_PER_SECOND,
+)
 
 
 class MongoDBManager:
@@ -67,10 +162,8 @@ class MongoDBManager:
             return self._client, self._db
 
     async def _create_client(self):
-        connection_string = f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/{MONGO_DB}?authSource=admin"
-
-        client = MongoClient(
-            connection_string,
+        client = AsyncIOMotorClient(
+            MONGO_URI,
             serverSelectionTimeoutMS=10000,
             connectTimeoutMS=10000,
             socketTimeoutMS=30000,
@@ -78,7 +171,7 @@ class MongoDBManager:
         )
 
         # Test connection
-        client.admin.command("ping")
+        await client.admin.command("ping")
         return client
 
     async def close(self):
@@ -89,6 +182,16 @@ class MongoDBManager:
 # Global MongoDB manager
 mongo_manager = MongoDBManager()
 
+# Batch sizes for the two write paths, tuned separately
+raw_pages_batch_sizer = BatchSizer(BATCH_SIZE, MIN_BATCH_SIZE, MAX_BATCH_SIZE)
+clinicians_batch_sizer = BatchSizer(BATCH_SIZE, MIN_BATCH_SIZE, MAX_BATCH_SIZE)
+
+# Raw page inserts run in the background; this bounds how many at once
+raw_pages_semaphore = asyncio.Semaphore(4)
+
+# LRU of clinician ids written during this run
+seen_clinician_ids = OrderedDict()
+
 
 async def wait_for_mongodb(max_retries=30, retry_interval=5):
     """Wait for MongoDB to be ready"""
@@ -99,7 +202,7 @@ async def wait_for_mongodb(max_retries=30, retry_interval=5):
         try:
             client, db = await mongo_manager.get_client()
             # Test database access
-            collections = db.list_collection_names()
+            collections = await db.list_collection_names()
             print(f"✅ Database access verified. Collections: {collections}")
             return True
         except Exception as e:
@@ -119,21 +222,24 @@ async def ensure_indexes():
         client, db = await mongo_manager.get_client()
 
         # Create collections if they don't exist
-        if "clinicians" not in db.list_collection_names():
-            db.create_collection("clinicians")
-        if "raw_pages" not in db.list_collection_names():
-            db.create_collection("raw_pages")
+        collections = await db.list_collection_names()
+        if "clinicians" not in collections:
+            await db.create_collection("clinicians")
+        if "raw_pages" not in collections:
+            await db.create_collection("raw_pages")
 
         # Create indexes concurrently
-        index_operations = [
+        await asyncio.gather(
             db.clinicians.create_index("clinician_id", unique=True),
             db.clinicians.create_index("location_state"),
             db.clinicians.create_index("location_city"),
             db.clinicians.create_index("telehealth"),
             db.clinicians.create_index("accepts_insurance"),
-            db.raw_pages.create_index([("state", 1), ("city", 1), ("page", 1)]),
+            db.raw_pages.create_index(
+                [("state", 1), ("city", 1), ("page", 1)]
+            ),
             db.raw_pages.create_index("scrape_timestamp"),
-        ]
+        )
 
         print("✅ Database indexes created/verified")
         return True
@@ -142,13 +248,54 @@ async def ensure_indexes():
         return False
 
 
-def get_all_states():
+async def get_json(
+    session: aiohttp.ClientSession, url: str, params: Optional[Dict] = None
+):
+    """GET a URL and decode its JSON body, raising on an error status"""
+    async with session.get(url, params=params, timeout=30) as response:
+        response.raise_for_status()
+        return await response.json(loads=orjson.loads)
+
+
+async def with_retry(request_factory, description: str):
+    """Await request_factory() through the rate limiter, retrying failures
+
+    Throttled or 5xx responses, dropped connections and timeouts are
+    retried up to MAX_RETRIES times with jittered exponential backoff.
+    Each attempt takes its own rate limiter slot, so retries count
+    against the same request budget. The last error is raised.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        await rate_limiter.acquire()
+        try:
+            result = await request_factory()
+        except aiohttp.ClientResponseError as e:
+            if e.status not in RETRY_STATUSES:
+                raise
+            rate_limiter.decrease_rate()
+            if attempt == MAX_RETRIES:
+                raise
+            reason = e.status
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == MAX_RETRIES:
+                raise
+            reason = type(e).__name__
+        else:
+            rate_limiter.increase_rate()
+            return result
+
+        delay = min(MAX_BACKOFF_SECONDS, 2**attempt) + random.random()
+        print(
+            f"🔁 {reason} fetching {description}, retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s"
+        )
+        await asyncio.sleep(delay)
+
+
+async def get_all_states(session: aiohttp.ClientSession):
     """Fetches and returns a de-duplicated list of all states from the API."""
     url = "https://therapyfinder.com/api/browse-states"
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        data = await with_retry(lambda: get_json(session, url), "states")
 
         all_states = []
         for item in data["data"]:
@@ -160,20 +307,20 @@ def get_all_states():
         print(f"✅ Found {len(unique_states)} unique states.")
         return unique_states
 
-    except requests.RequestException as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
         print(f"❌ Failed to fetch states: {e}")
         return []
 
 
-def get_cities_for_state(state_name):
+async def get_cities_for_state(session: aiohttp.ClientSession, state_name):
     """Fetches and returns a list of cities for a given state."""
     state_param = state_name.lower()
     url = f"https://therapyfinder.com/api/browse-cities?filter[state]={state_param}"
 
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        data = await with_retry(
+            lambda: get_json(session, url), f"cities for {state_name}"
+        )
 
         all_cities = []
         for item in data["data"]:
@@ -184,7 +331,7 @@ def get_cities_for_state(state_name):
         print(f"✅ Found {len(unique_cities)} cities in {state_name}.")
         return unique_cities
 
-    except requests.RequestException as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
         print(f"❌ Failed to fetch cities for {state_name}: {e}")
         return []
 
@@ -196,7 +343,15 @@ async def store_raw_pages_batch(raw_pages_batch: List[Dict]):
 
     try:
         client, db = await mongo_manager.get_client()
-        result = db.raw_pages.insert_many(raw_pages_batch, ordered=False)
+        async with raw_pages_semaphore:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            # Ordered: pages refer back to included objects stored on
+            # earlier pages, so a page is only written after those are
+            result = await db.raw_pages.insert_many(
+                raw_pages_batch, ordered=True
+            )
+            raw_pages_batch_sizer.record(loop.time() - started)
         return len(result.inserted_ids)
     except Exception as e:
         print(f"❌ Error storing raw pages batch: {e}")
@@ -204,28 +359,76 @@ async def store_raw_pages_batch(raw_pages_batch: List[Dict]):
 
 
 async def process_clinicians_batch(clinicians_batch: List[Dict]):
-    """Process and store multiple clinicians in a single batch operation"""
+    """Process and store multiple clinicians in a single batch operation
+
+    Clinicians not yet seen in this run are inserted in one unordered
+    insert_many, which is much cheaper than an upsert per document. The
+    ones that already exist (seen earlier, or stored by a previous run and
+    rejected as duplicate keys) are upserted as before.
+    """
     if not clinicians_batch:
         return
 
     try:
         client, db = await mongo_manager.get_client()
+        now = datetime.utcnow()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
 
-        operations = []
+        new_clinicians = []
+        known_clinicians = []
         for clinician_data in clinicians_batch:
-            operation = UpdateOne(
-                {"clinician_id": clinician_data["clinician_id"]},
-                {
-                    "$set": clinician_data,
-                    "$setOnInsert": {"created_at": datetime.utcnow()},
-                },
-                upsert=True,
+            if clinician_data["clinician_id"] in seen_clinician_ids:
+                known_clinicians.append(clinician_data)
+            else:
+                new_clinicians.append(clinician_data)
+
+        written = 0
+        if new_clinicians:
+            try:
+                # Copies, so the _id insert_many adds stays out of the
+                # documents that may still be upserted below
+                result = await db.clinicians.insert_many(
+                    [{**c, "created_at": now} for c in new_clinicians],
+                    ordered=False,
+                )
+                written += len(result.inserted_ids)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(
+                    err.get("code") != DUPLICATE_KEY_ERROR for err in errors
+                ):
+                    raise
+                written += e.details.get("nInserted", 0)
+                known_clinicians.extend(
+                    new_clinicians[err["index"]] for err in errors
+                )
+
+        if known_clinicians:
+            operations = [
+                UpdateOne(
+                    {"clinician_id": clinician_data["clinician_id"]},
+                    {
+                        "$set": clinician_data,
+                        "$setOnInsert": {"created_at": now},
+                    },
+                    upsert=True,
+                )
+                for clinician_data in known_clinicians
+            ]
+            result = await db.clinicians.bulk_write(
+                operations, ordered=False
             )
-            operations.append(operation)
+            written += result.upserted_count + result.modified_count
+        clinicians_batch_sizer.record(loop.time() - started)
 
-        if operations:
-            result = db.clinicians.bulk_write(operations, ordered=False)
-            return result.upserted_count + result.modified_count
+        for clinician_data in clinicians_batch:
+            seen_clinician_ids[clinician_data["clinician_id"]] = None
+            seen_clinician_ids.move_to_end(clinician_data["clinician_id"])
+        while len(seen_clinician_ids) > SEEN_CLINICIANS_LIMIT:
+            seen_clinician_ids.popitem(last=False)
+
+        return written
     except Exception as e:
         print(f"❌ Error processing clinicians batch: {e}")
 
@@ -235,25 +438,24 @@ async def process_clinicians_batch(clinicians_batch: List[Dict]):
 async def fetch_page(
     session: aiohttp.ClientSession, url: str, params: Dict
 ) -> Optional[Dict]:
-    """Fetch a single page with rate limiting and error handling"""
-    await rate_limiter.acquire()
-
+    """Fetch a single page with rate limiting, retries and error handling"""
     try:
-        async with session.get(url, params=params, timeout=30) as response:
-            response.raise_for_status()
-            return await response.json()
+        return await with_retry(lambda: get_json(session, url, params), "page")
     except asyncio.TimeoutError:
         print(f"❌ Timeout fetching page with params: {params}")
     except aiohttp.ClientError as e:
         print(f"❌ Error fetching page: {e}")
     except Exception as e:
         print(f"❌ Unexpected error fetching page: {e}")
-
     return None
 
 
 async def scrape_city_concurrent(
-    city_param: str, state: str, city_name: str, semaphore: asyncio.Semaphore
+    city_param: str,
+    state: str,
+    city_name: str,
+    semaphore: asyncio.Semaphore,
+    session: aiohttp.ClientSession,
 ):
     """Scrape all pages for a specific city concurrently"""
     async with semaphore:
@@ -265,82 +467,132 @@ async def scrape_city_concurrent(
 
         raw_pages_batch = []
         clinicians_batch = []
+        # Raw pages are only archived, so the page loop does not wait on them
+        raw_pages_tasks = []
+        # (type, id) of included objects on this city's pages that are
+        # already written, and of those new in the unflushed batch
+        archived_included = set()
+        batch_included = set()
+
+        async def store_batch(batch, batch_keys):
+            # Later batches may only refer to a fully written one
+            if await store_raw_pages_batch(batch) == len(batch):
+                archived_included.update(batch_keys)
+
+        # API parameters; only the page number changes between requests
+        params = {
+            "featureFlags[featureUseActiveLocationList]": "true",
+            "featureFlags[featureUseStatewideTelehealth]": "true",
+            "filter[directoryPageUrl]": city_param,
+            "include": "specialties,insuranceCarriers,clinicianProfessionalLicenses.globalLicenseType,offices,availabilities,practice",
+            "page[size]": 20,
+            "page[number]": page,
+        }
 
-        async with aiohttp.ClientSession() as session:
-            while has_more_pages:
-                if SCRAPE_LIMIT > 0 and total_city_records >= SCRAPE_LIMIT:
-                    print(f"⏹️ Reached scrape limit for city {city_name}")
-                    break
+        while has_more_pages:
+            if SCRAPE_LIMIT > 0 and total_city_records >= SCRAPE_LIMIT:
+                print(f"⏹️ Reached scrape limit for city {city_name}")
+                break
 
-                # API parameters
-                params = {
-                    "featureFlags[featureUseActiveLocationList]": "true",
-                    "featureFlags[featureUseStatewideTelehealth]": "true",
-                    "filter[directoryPageUrl]": city_param,
-                    "include": "specialties,insuranceCarriers,clinicianProfessionalLicenses.globalLicenseType,offices,availabilities,practice",
-                    "page[size]": 20,
-                    "page[number]": page,
+            params["page[number]"] = page
+            data = await fetch_page(session, API_URL, params)
+            if data and "included" in data:
+                linked = link_relationships(data["data"], data["included"])
+                # Reversed so a repeated id maps to its first clinician
+                by_id = {c["id"]: c for c in reversed(data["data"])}
+                for k, v in linked.items():
+                    if k in by_id:
+                        by_id[k]["linked"] = v["relationships"]
+                # Referenced objects are archived under each clinician's
+                # "linked" field, so the raw page keeps only the rest
+                embedded = {
+                    (obj["type"], obj["id"])
+                    for item in linked.values()
+                    for rel in item["relationships"].values()
+                    for obj in (rel if isinstance(rel, list) else [rel])
+                    if obj is not None
                 }
-
-                data = await fetch_page(session, API_URL, params)
-                if data and "included" in data:
-                    linked = link_relationships(data["data"], data["included"])
-                    for k, v in linked.items():
-                        clinician = next(
-                            (c for c in data["data"] if c["id"] == k), None
+                # Objects an earlier page of this city already archived
+                # are stored as resource identifiers instead of copies
+                included, included_refs = [], []
+                for i in data["included"]:
+                    key = (i["type"], i["id"])
+                    if key in embedded:
+                        continue
+                    if key in archived_included or key in batch_included:
+                        included_refs.append(
+                            {"type": i["type"], "id": i["id"]}
                         )
-                        if clinician:
-                            clinician["linked"] = v["relationships"]
-                if not data or not data.get("data"):
-                    print(f"❌ No data found for {city_name} page {page}")
-                    break
-
-                # Store raw page in batch
-                raw_page = {
-                    "state": state,
-                    "city": city_name,
-                    "page": page,
-                    "scrape_timestamp": datetime.utcnow(),
-                    "data": data,
-                }
-                raw_pages_batch.append(raw_page)
+                    else:
+                        batch_included.add(key)
+                        included.append(i)
+                data["included"] = included
+                data["included_refs"] = included_refs
+            if not data or not data.get("data"):
+                print(f"❌ No data found for {city_name} page {page}")
+                break
 
-                # Process clinicians
-                for clinician in data["data"]:
-                    if SCRAPE_LIMIT > 0 and total_city_records >= SCRAPE_LIMIT:
-                        break
+            # One timestamp for the page and every clinician on it
+            now = datetime.utcnow()
+
+            # Store raw page in batch, as one compressed JSON blob so
+            # BSON does not walk the nested document; read it back with
+            # orjson.loads(zlib.decompress(raw_page["payload"]))
+            raw_page = {
+                "state": state,
+                "city": city_name,
+                "page": page,
+                "scrape_timestamp": now,
+                "payload": Binary(zlib.compress(orjson.dumps(data))),
+            }
+            raw_pages_batch.append(raw_page)
+
+            # Process clinicians
+            for clinician in data["data"]:
+                if SCRAPE_LIMIT > 0 and total_city_records >= SCRAPE_LIMIT:
+                    break
 
-                    clinician_data = process_single_clinician(
-                        clinician, state, city_name
+                clinician_data = process_single_clinician(
+                    clinician, state, city_name, now
+                )
+                if clinician_data:
+                    clinicians_batch.append(clinician_data)
+                    total_city_records += 1
+
+            # Process batches if they reach the batch size
+            if len(raw_pages_batch) >= raw_pages_batch_sizer.size:
+                raw_pages_tasks.append(
+                    asyncio.create_task(
+                        store_batch(raw_pages_batch, batch_included)
                     )
-                    if clinician_data:
-                        clinicians_batch.append(clinician_data)
-                        total_city_records += 1
-
-                # Process batches if they reach the batch size
-                if len(raw_pages_batch) >= BATCH_SIZE:
-                    await store_raw_pages_batch(raw_pages_batch)
-                    raw_pages_batch = []
+                )
+                raw_pages_batch = []
+                batch_included = set()
 
-                if len(clinicians_batch) >= BATCH_SIZE:
-                    await process_clinicians_batch(clinicians_batch)
-                    clinicians_batch = []
+            if len(clinicians_batch) >= clinicians_batch_sizer.size:
+                await process_clinicians_batch(clinicians_batch)
+                clinicians_batch = []
 
-                print(
-                    f"✅ Page {page} for {city_name} processed. Records: {len(data['data'])}, Total for city: {total_city_records}"
-                )
+            print(
+                f"✅ Page {page} for {city_name} processed. Records: {len(data['data'])}, Total for city: {total_city_records}"
+            )
 
-                # Check for next page
-                if "next" not in data.get("links", {}):
-                    has_more_pages = False
-                else:
-                    page += 1
+            # Check for next page
+            if "next" not in data.get("links", {}):
+                has_more_pages = False
+            else:
+                page += 1
 
         # Process any remaining batches
         if raw_pages_batch:
-            await store_raw_pages_batch(raw_pages_batch)
+            raw_pages_tasks.append(
+                asyncio.create_task(
+                    store_batch(raw_pages_batch, batch_included)
+                )
+            )
         if clinicians_batch:
             await process_clinicians_batch(clinicians_batch)
+        await asyncio.gather(*raw_pages_tasks)
 
         print(
             f"✅ Completed scraping {city_name}. Total records: {total_city_records}"
@@ -349,7 +601,7 @@ async def scrape_city_concurrent(
 
 
 def process_single_clinician(
-    clinician: Dict, state: str, city_name: str
+    clinician: Dict, state: str, city_name: str, now: datetime
 ) -> Optional[Dict]:
     """Process a single clinician and return data for batch insertion"""
     try:
@@ -361,8 +613,8 @@ def process_single_clinician(
             "attributes": attributes,
             "location_state": state,
             "location_city": city_name,
-            "scraped_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
+            "scraped_at": now,
+            "updated_at": now,
             "first_name": attributes.get("firstName"),
             "last_name": attributes.get("lastName"),
             "display_name": attributes.get("displayName"),
@@ -383,111 +635,154 @@ def process_single_clinician(
         return None
 
 
-async def scrape_state_concurrent(state: str, semaphore: asyncio.Semaphore):
+async def scrape_state_concurrent(
+    state: str,
+    cities: List[str],
+    semaphore: asyncio.Semaphore,
+    session: aiohttp.ClientSession,
+):
     """Scrape all cities in a state concurrently"""
     print(f"\n🏁 Processing state: {state}")
-    cities = get_cities_for_state(state)
+    # A failed city lookup is reported like any other error in this state
+    if isinstance(cities, BaseException):
+        raise cities
 
     if not cities:
         print(f"⚠️ No cities found for {state}, skipping...")
         return 0
 
-    # Create tasks for all cities in this state
+    # Create tasks for all cities in this state; the semaphore bounds
+    # how many of them scrape at once
     tasks = []
     for city in cities:
-        if (
-            SCRAPE_LIMIT > 0
-            and sum(task.result() for task in tasks if task.done())
-            >= SCRAPE_LIMIT
-        ):
-            break
-
         city_name, state_code = map(str.strip, city.split(","))
         city_param = (
             f"{city_name.lower().replace(' ', '-')}-{state_code.lower()}"
         )
 
         task = asyncio.create_task(
-            scrape_city_concurrent(city_param, state, city_name, semaphore)
+            scrape_city_concurrent(
+                city_param, state, city_name, semaphore, session
+            )
         )
         tasks.append(task)
 
-    # Wait for all city tasks to complete with timeout
+    # Count records as cities finish, so the limit can stop the rest
+    state_records = 0
     try:
-        state_results = await asyncio.wait_for(
-            asyncio.gather(*tasks, return_exceptions=True),
-            timeout=3600,  # 1 hour timeout per state
-        )
-    except asyncio.TimeoutError:
+        async with asyncio.timeout(3600):  # 1 hour timeout per state
+            for next_city in asyncio.as_completed(tasks):
+                try:
+                    state_records += await next_city
+                except Exception as e:
+                    print(f"❌ Error in city task: {e}")
+                    continue
+                if SCRAPE_LIMIT > 0 and state_records >= SCRAPE_LIMIT:
+                    print(f"⏹️ Reached scrape limit for state {state}")
+                    break
+    except TimeoutError:
         print(f"❌ Timeout processing state {state}")
         return 0
-
-    # Process results
-    state_records = 0
-    for result in state_results:
-        if isinstance(result, Exception):
-            print(f"❌ Error in city task: {result}")
-        else:
-            state_records += result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     print(f"✅ Completed state: {state}. Total records: {state_records}")
     return state_records
 
 
+def request_shutdown(signal_name: str):
+    """Cancel every running task; main's cleanup then closes connections"""
+    print(f"🛑 Received {signal_name}, shutting down...")
+    for task in asyncio.all_tasks():
+        task.cancel()
+
+
 async def main():
     print("🚀 Starting Optimized TherapyFinder Scraper...")
 
+    # docker stop sends SIGTERM; without this the process dies with its
+    # HTTP and MongoDB sockets still open
+    if sys.platform != "win32":
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, request_shutdown, "SIGTERM"
+        )
+
     # Wait for MongoDB to be ready
     if not await wait_for_mongodb():
         print("❌ Exiting due to MongoDB connection failure")
         sys.exit(1)
 
+    # One keep-alive pool for every city, so connections and DNS answers
+    # are reused instead of each city paying its own handshakes
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONCURRENT_REQUESTS * 4,
+        limit_per_host=MAX_CONCURRENT_REQUESTS * 2,
+        ttl_dns_cache=600,
+        keepalive_timeout=60,
+    )
+    session = aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout(total=30)
+    )
+
     try:
         # Ensure indexes exist
         if not await ensure_indexes():
             print("⚠️ Failed to create indexes, but continuing...")
 
         # Get all states dynamically
-        STATES = get_all_states()
+        STATES = await get_all_states(session)
         if not STATES:
             print("❌ Exiting: Could not retrieve state list.")
             return
 
+        # City lists are small; fetch them all up front, in parallel
+        cities_per_state = dict(
+            zip(
+                STATES,
+                await asyncio.gather(
+                    *(get_cities_for_state(session, state) for state in STATES),
+                    return_exceptions=True,
+                ),
+            )
+        )
+
         # Create semaphore to limit concurrent requests
         semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
         total_records = 0
         total_states_processed = 0
 
-        # Process states with limited concurrency
-        for i in range(0, len(STATES), MAX_CONCURRENT_REQUESTS // 2):
-            if SCRAPE_LIMIT > 0 and total_records >= SCRAPE_LIMIT:
-                print(
-                    f"⏹️ Reached global scrape limit of {SCRAPE_LIMIT} records"
-                )
-                break
-
-            batch_states = STATES[i : i + MAX_CONCURRENT_REQUESTS // 2]
-            print(f"\n📦 Processing batch of {len(batch_states)} states...")
-
-            # Create tasks for current batch of states
-            state_tasks = [
-                scrape_state_concurrent(state, semaphore)
-                for state in batch_states
-            ]
-
-            # Wait for batch to complete
-            batch_results = await asyncio.gather(
-                *state_tasks, return_exceptions=True
-            )
+        # States share a fixed number of slots; a finished state frees
+        # its slot at once instead of waiting on the slowest of a batch
+        state_slots = asyncio.Semaphore(max(1, MAX_CONCURRENT_REQUESTS // 2))
+
+        async def scrape_state(state):
+            async with state_slots:
+                if SCRAPE_LIMIT > 0 and total_records >= SCRAPE_LIMIT:
+                    return state, None
+                try:
+                    return state, await scrape_state_concurrent(
+                        state, cities_per_state[state], semaphore, session
+                    )
+                except Exception as e:
+                    return state, e
 
-            # Process batch results
-            for state, result in zip(batch_states, batch_results):
-                if isinstance(result, Exception):
-                    print(f"❌ Error processing state {state}: {result}")
-                else:
-                    total_records += result
-                    total_states_processed += 1
+        for next_state in asyncio.as_completed(
+            [scrape_state(state) for state in STATES]
+        ):
+            state, result = await next_state
+            if result is None:
+                continue
+            if isinstance(result, Exception):
+                print(f"❌ Error processing state {state}: {result}")
+            else:
+                total_records += result
+                total_states_processed += 1
+
+        if SCRAPE_LIMIT > 0 and total_records >= SCRAPE_LIMIT:
+            print(f"⏹️ Reached global scrape limit of {SCRAPE_LIMIT} records")
 
         print(f"\n🎉 SCRAPING COMPLETED")
         print(f"📊 Total states processed: {total_states_processed}")
@@ -496,12 +791,15 @@ async def main():
         # Print statistics
         await print_statistics()
 
+    except asyncio.CancelledError:
+        print("⏹️ Scraping cancelled")
     except Exception as e:
         print(f"❌ Error during scraping: {e}")
         import traceback
 
         traceback.print_exc()
     finally:
+        await session.close()
         await mongo_manager.close()
         print("🔌 MongoDB connection closed")
 
@@ -518,11 +816,14 @@ def link_relationships(data, included):
         }
         for rel_name, rel_data in relationships.items():
             rel_objects = rel_data.get("data")
+            if rel_objects is None:
+                continue
             if isinstance(rel_objects, list):
                 linked_item["relationships"][rel_name] = [
-                    included_map.get((r["type"], r["id"]))
+                    obj
                     for r in rel_objects
-                    if included_map.get((r["type"], r["id"])) is not None
+                    if (obj := included_map.get((r["type"], r["id"])))
+                    is not None
                 ]
             elif isinstance(rel_objects, dict):
                 linked_item["relationships"][rel_name] = included_map.get(
@@ -537,8 +838,8 @@ async def print_statistics():
     try:
         client, db = await mongo_manager.get_client()
 
-        clinicians_count = db.clinicians.count_documents({})
-        raw_pages_count = db.raw_pages.count_documents({})
+        clinicians_count = await db.clinicians.count_documents({})
+        raw_pages_count = await db.raw_pages.count_documents({})
 
         print(f"👥 Total clinicians in database: {clinicians_count}")
         print(f"📄 Total raw pages stored: {raw_pages_count}")
@@ -549,7 +850,7 @@ async def print_statistics():
             {"$group": {"_id": "$location_state", "count": {"$sum": 1}}},
             {"$sort": {"count": -1}},
         ]
-        state_counts = list(db.clinicians.aggregate(pipeline))
+        state_counts = await db.clinicians.aggregate(pipeline).to_list(None)
         for state_count in state_counts:
             print(f"  {state_count['_id']}: {state_count['count']}")
 
@@ -560,7 +861,7 @@ async def print_statistics():
             {"$sort": {"count": -1}},
             {"$limit": 10},
         ]
-        city_counts = list(db.clinicians.aggregate(pipeline))
+        city_counts = await db.clinicians.aggregate(pipeline).to_list(None)
         for city_count in city_counts:
             print(f"  {city_count['_id']}: {city_count['count']}")
 